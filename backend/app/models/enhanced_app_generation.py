@@ -1037,13 +1037,18 @@ app.on('activate', () => {
         zip_filename = f"generated_app_{task_id}.zip"
         zip_path = self.output_dir / zip_filename
         
+        # Compressing the project tree is blocking I/O and CPU work; keep it off the event loop
+        await asyncio.to_thread(self._write_project_zip, project_dir, zip_path)
+        
+        return zip_path
+    
+    @staticmethod
+    def _write_project_zip(project_dir: Path, zip_path: Path):
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             for file_path in project_dir.rglob('*'):
                 if file_path.is_file():
                     arcname = file_path.relative_to(project_dir)
                     zipf.write(file_path, arcname)
-        
-        return zip_path
     
     async def _setup_build_environment(self, build_dir: Path, app_code: str, app_name: str, framework: str):
         """Setup build environment for APK generation"""
@@ -22,6 +22,17 @@ class EnhancedAudioGenerationService:
     - Custom GitHub models
     """
     
+    GENRE_ENHANCEMENTS = {
+        'ambient': 'atmospheric, dreamy, peaceful, ethereal sounds',
+        'electronic': 'synthesizers, beats, digital, energetic',
+        'classical': 'orchestral, elegant, sophisticated, timeless',
+        'rock': 'guitars, drums, powerful, energetic',
+        'jazz': 'smooth, improvised, sophisticated, soulful',
+        'pop': 'catchy, mainstream, melodic, upbeat',
+        'hip-hop': 'rhythmic, beats, urban, contemporary',
+        'folk': 'acoustic, traditional, storytelling, organic'
+    }
+    
     def __init__(self):
         self.models = {
             'musicgen': {
@@ -469,18 +480,7 @@ class EnhancedAudioGenerationService:
     def _enhance_music_prompt(self, prompt: str, genre: Optional[str]) -> str:
         """Enhance music prompt with genre and quality descriptors"""
         
-        genre_enhancements = {
-            'ambient': 'atmospheric, dreamy, peaceful, ethereal sounds',
-            'electronic': 'synthesizers, beats, digital, energetic',
-            'classical': 'orchestral, elegant, sophisticated, timeless',
-            'rock': 'guitars, drums, powerful, energetic',
-            'jazz': 'smooth, improvised, sophisticated, soulful',
-            'pop': 'catchy, mainstream, melodic, upbeat',
-            'hip-hop': 'rhythmic, beats, urban, contemporary',
-            'folk': 'acoustic, traditional, storytelling, organic'
-        }
-        
-        enhancement = genre_enhancements.get(genre or 'ambient', 'high quality music')
+        enhancement = self.GENRE_ENHANCEMENTS.get(genre or 'ambient', 'high quality music')
         return f"{prompt}, {enhancement}, professional quality, clear sound"
     
     async def _simulate_audio_generation(self, duration: int):
@@ -494,11 +494,10 @@ class EnhancedAudioGenerationService:
         placeholder_content = f"Generated {audio_type} - Duration: {duration}s"
         
         # Create placeholder text file (replace with actual audio generation)
-        with open(output_path.with_suffix('.txt'), 'w') as f:
-            f.write(placeholder_content)
+        await asyncio.to_thread(output_path.with_suffix('.txt').write_text, placeholder_content)
         
         # Simulate audio file
-        output_path.touch()
+        await asyncio.to_thread(output_path.touch)
     
     async def health_check(self) -> Dict[str, Any]:
         """Check service health and model availability"""
@@ -24,6 +24,28 @@ class EnhancedImageGenerationService:
     - GIMP and Inkscape integration
     """
     
+    STYLE_ENHANCEMENTS = {
+        'photorealistic': 'photorealistic, high detail, sharp focus, professional photography',
+        'artistic': 'artistic, creative composition, masterpiece, detailed artwork',
+        'anime': 'anime style, detailed anime art, vibrant colors, manga style',
+        'cartoon': 'cartoon style, colorful illustration, animated art',
+        'digital-art': 'digital art, concept art, detailed digital painting',
+        'oil-painting': 'oil painting, classical art, painterly style, traditional art',
+        'watercolor': 'watercolor painting, soft colors, artistic medium',
+        'sketch': 'pencil sketch, line art, detailed drawing',
+        'cyberpunk': 'cyberpunk style, neon colors, futuristic, high-tech',
+        'fantasy': 'fantasy art, magical, mystical, ethereal',
+        'horror': 'horror art, dark atmosphere, scary, dramatic shadows',
+        'minimalist': 'minimalist style, clean design, simple composition'
+    }
+    
+    SIZE_PRESETS = {
+        '512': {'width': 512, 'height': 512},
+        '1024': {'width': 1024, 'height': 1024},
+        'hd': {'width': 1920, 'height': 1080},
+        'square': {'width': 1024, 'height': 1024}
+    }
+    
     def __init__(self):
         self.models = {
             'stable-diffusion': {
@@ -170,6 +192,78 @@ class EnhancedImageGenerationService:
                 'prompt': prompt
             }
     
+    async def generate_image_batch(
+        self,
+        prompts: List[str],
+        style: str = 'photorealistic',
+        size: str = '1024x1024',
+        model: str = 'stable-diffusion',
+        negative_prompt: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate one image per prompt, in a single pipeline pass where the model allows it
+        
+        All prompts share the other settings. Returns one result per prompt, in
+        order, shaped like generate_image's.
+        """
+        
+        if model != 'stable-diffusion':
+            # Only the diffusers pipeline takes a list of prompts; run the others individually
+            return list(await asyncio.gather(*(
+                self.generate_image(prompt, style, size, model, negative_prompt, 1)
+                for prompt in prompts
+            )))
+        
+        try:
+            logger.info(f"Starting batched image generation with model: {model} ({len(prompts)} prompts)")
+            
+            task_id = str(uuid.uuid4())
+            enhanced_prompts = [self._enhance_image_prompt(prompt, style) for prompt in prompts]
+            dimensions = self._parse_size(size)
+            
+            # Stable Diffusion API parameters, one batch entry per prompt
+            api_payload = {
+                'prompt': enhanced_prompts,
+                'negative_prompt': [negative_prompt or self._get_default_negative_prompt()] * len(prompts),
+                'width': dimensions['width'],
+                'height': dimensions['height'],
+                'num_inference_steps': 50,
+                'guidance_scale': 7.5,
+                'num_images_per_prompt': 1,
+                'safety_checker': True
+            }
+            
+            # Simulate one batched generation pass
+            await self._simulate_image_generation(1)
+            
+            results = []
+            for i, (prompt, enhanced_prompt) in enumerate(zip(prompts, enhanced_prompts)):
+                filename = f"stable_diffusion_{task_id}_{i}.png"
+                image_path = self.output_dir / filename
+                
+                await self._create_placeholder_image(image_path, size, 'stable-diffusion')
+                
+                results.append({
+                    'success': True,
+                    'imageUrls': [f"/static/generated/images/{filename}"],
+                    'model': 'stable-diffusion',
+                    'prompt': prompt,
+                    'enhanced_prompt': enhanced_prompt,
+                    'negative_prompt': negative_prompt,
+                    'size': size,
+                    'num_images': 1,
+                    'task_id': task_id,
+                    'created_at': datetime.utcnow().isoformat()
+                })
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Batched image generation failed: {str(e)}")
+            return [
+                {'success': False, 'error': str(e), 'model': model, 'prompt': prompt}
+                for prompt in prompts
+            ]
+    
     async def enhance_image(
         self, image_file, tool: str, model: str = 'gfpgan'
     ) -> Dict[str, Any]:
@@ -621,22 +715,7 @@ class EnhancedImageGenerationService:
     def _enhance_image_prompt(self, prompt: str, style: str) -> str:
         """Enhance image prompt with style and quality descriptors"""
         
-        style_enhancements = {
-            'photorealistic': 'photorealistic, high detail, sharp focus, professional photography',
-            'artistic': 'artistic, creative composition, masterpiece, detailed artwork',
-            'anime': 'anime style, detailed anime art, vibrant colors, manga style',
-            'cartoon': 'cartoon style, colorful illustration, animated art',
-            'digital-art': 'digital art, concept art, detailed digital painting',
-            'oil-painting': 'oil painting, classical art, painterly style, traditional art',
-            'watercolor': 'watercolor painting, soft colors, artistic medium',
-            'sketch': 'pencil sketch, line art, detailed drawing',
-            'cyberpunk': 'cyberpunk style, neon colors, futuristic, high-tech',
-            'fantasy': 'fantasy art, magical, mystical, ethereal',
-            'horror': 'horror art, dark atmosphere, scary, dramatic shadows',
-            'minimalist': 'minimalist style, clean design, simple composition'
-        }
-        
-        enhancement = style_enhancements.get(style, 'high quality, detailed')
+        enhancement = self.STYLE_ENHANCEMENTS.get(style, 'high quality, detailed')
         return f"{prompt}, {enhancement}, 8k, masterpiece"
     
     def _get_default_negative_prompt(self) -> str:
@@ -650,13 +729,7 @@ class EnhancedImageGenerationService:
             width, height = map(int, size.split('x'))
         else:
             # Handle preset sizes
-            size_presets = {
-                '512': {'width': 512, 'height': 512},
-                '1024': {'width': 1024, 'height': 1024},
-                'hd': {'width': 1920, 'height': 1080},
-                'square': {'width': 1024, 'height': 1024}
-            }
-            return size_presets.get(size, {'width': 1024, 'height': 1024})
+            return self.SIZE_PRESETS.get(size, {'width': 1024, 'height': 1024})
         
         return {'width': width, 'height': height}
     
@@ -672,11 +745,10 @@ class EnhancedImageGenerationService:
         # Create a simple text file as placeholder (replace with actual image generation)
         placeholder_content = f"Generated image - Size: {size}, Model: {model_type}, Timestamp: {datetime.utcnow().isoformat()}"
         
-        with open(output_path.with_suffix('.txt'), 'w') as f:
-            f.write(placeholder_content)
+        await asyncio.to_thread(output_path.with_suffix('.txt').write_text, placeholder_content)
         
         # Simulate image file
-        output_path.touch()
+        await asyncio.to_thread(output_path.touch)
     
     async def health_check(self) -> Dict[str, Any]:
         """Check service health and model availability"""
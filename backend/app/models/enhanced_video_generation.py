@@ -1,5 +1,4 @@
 import asyncio
-import aiohttp
 import os
 import tempfile
 import uuid
@@ -23,6 +22,17 @@ class EnhancedVideoGenerationService:
     - Custom GitHub models
     """
     
+    STYLE_ENHANCEMENTS = {
+        'cinematic': 'cinematic, dramatic lighting, film grain, depth of field',
+        'anime': 'anime style, vibrant colors, detailed animation',
+        'realistic': 'photorealistic, high detail, natural lighting',
+        'artistic': 'artistic, creative, stylized, beautiful composition',
+        'cartoon': 'cartoon style, colorful, animated, fun',
+        'sci-fi': 'futuristic, sci-fi, high-tech, glowing effects',
+        'fantasy': 'fantasy, magical, mystical, ethereal',
+        'horror': 'horror, dark, scary, dramatic shadows'
+    }
+    
     def __init__(self):
         self.models = {
             'wan2.2': {
@@ -446,18 +456,7 @@ class EnhancedVideoGenerationService:
     def _enhance_prompt(self, prompt: str, style: str) -> str:
         """Enhance prompt with style and quality descriptors"""
         
-        style_enhancements = {
-            'cinematic': 'cinematic, dramatic lighting, film grain, depth of field',
-            'anime': 'anime style, vibrant colors, detailed animation',
-            'realistic': 'photorealistic, high detail, natural lighting',
-            'artistic': 'artistic, creative, stylized, beautiful composition',
-            'cartoon': 'cartoon style, colorful, animated, fun',
-            'sci-fi': 'futuristic, sci-fi, high-tech, glowing effects',
-            'fantasy': 'fantasy, magical, mystical, ethereal',
-            'horror': 'horror, dark, scary, dramatic shadows'
-        }
-        
-        enhancement = style_enhancements.get(style, 'high quality, detailed')
+        enhancement = self.STYLE_ENHANCEMENTS.get(style, 'high quality, detailed')
         return f"{prompt}, {enhancement}, 4k, smooth motion"
     
     def _create_deforum_keyframes(
@@ -507,11 +506,10 @@ class EnhancedVideoGenerationService:
         placeholder_content = f"Generated video - Duration: {duration}s, Resolution: {resolution}"
         
         # Create a simple text file as placeholder (replace with actual video generation)
-        with open(output_path.with_suffix('.txt'), 'w') as f:
-            f.write(placeholder_content)
+        await asyncio.to_thread(output_path.with_suffix('.txt').write_text, placeholder_content)
         
         # Simulate video file
-        output_path.touch()
+        await asyncio.to_thread(output_path.touch)
     
     async def health_check(self) -> Dict[str, Any]:
         """Check service health and model availability"""
@@ -5,7 +5,7 @@ Lightweight cloud backend for mobile app with Hugging Face integration
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, UploadFile, File, WebSocket, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import asyncio
 import uuid
@@ -16,7 +16,7 @@ import logging
 
 # Import cloud services
 from services.huggingface_connector import HuggingFaceConnector
-from services.task_manager import TaskManager, TaskType
+from services.task_manager import TaskManager, TaskType, TaskQueueFull
 from services.result_storage import ResultStorage
 from services.user_manager import UserManager
 from services.security_manager import SecurityManager
@@ -27,7 +27,8 @@ app = FastAPI(
     description="Cloud backend for AI Agent Studio mobile app",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for mobile app
@@ -44,7 +45,7 @@ hf_connector = HuggingFaceConnector()
 from services.task_manager import task_manager
 from services.result_storage import result_storage
 from services.user_manager import user_manager
-from services.security_manager import security_manager
+from services.security_manager import security_manager, ConcurrencyLimitExceeded
 
 # Security
 security = HTTPBearer()
@@ -52,6 +53,15 @@ security = HTTPBearer()
 # WebSocket connections
 active_connections: Dict[str, WebSocket] = {}
 
+# Task workers live for the lifetime of the app
+@app.on_event("startup")
+async def start_task_workers():
+    await task_manager.start()
+
+@app.on_event("shutdown")
+async def stop_task_workers():
+    await task_manager.stop()
+
 # Dependency to get current user
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from JWT token"""
@@ -87,7 +97,12 @@ async def security_middleware(request: Request, call_next):
             content={"detail": security_check["reason"]}
         )
     
-    response = await call_next(request)
+    try:
+        async with security_manager.request_guard(str(request.url.path), client_ip):
+            response = await call_next(request)
+    except ConcurrencyLimitExceeded as e:
+        return JSONResponse(status_code=429, content={"detail": str(e)})
+    
     return response
 
 @app.get("/")
@@ -191,6 +206,8 @@ async def generate_video_cloud(
             }
         }
         
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
@@ -242,6 +259,8 @@ async def generate_audio_cloud(
             }
         }
         
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
@@ -293,6 +312,8 @@ async def generate_code_cloud(
             }
         }
         
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
@@ -350,6 +371,8 @@ async def generate_image_cloud(
             }
         }
         
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
@@ -364,9 +387,9 @@ async def get_task_status(task_id: str):
         
         return {
             "task_id": task_id,
-            "status": task.status.value,
+            "status": task.status,
             "progress": task.progress,
-            "type": task.type.value,
+            "type": task.type,
             "prompt": task.prompt,
             "result": task.result,
             "error": task.error,
@@ -392,13 +415,14 @@ async def get_user_tasks(
             raise HTTPException(status_code=403, detail="Access denied")
         
         tasks = await task_manager.get_user_tasks(user_id, limit)
-        task_dicts = [task.to_dict() for task in tasks]
         
-        return {
-            "tasks": task_dicts,
-            "total": len(task_dicts),
+        # orjson encodes the Task dataclasses directly (enums by value, datetimes
+        # as ISO strings, private fields skipped), the same output as to_dict()
+        return ORJSONResponse({
+            "tasks": tasks,
+            "total": len(tasks),
             "limit": limit
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get tasks: {str(e)}")
@@ -8,7 +8,7 @@ from typing import Optional, Dict, Any
 import logging
 
 from services.advanced_ai_models import advanced_ai_models
-from services.task_manager import task_manager, TaskType
+from services.task_manager import task_manager, TaskType, TaskQueueFull
 from services.user_manager import user_manager
 from services.security_manager import security_manager
 from services.api_key_manager import api_key_manager
@@ -73,6 +73,8 @@ async def generate_image_to_video(
             "model": model,
             "message": "Image-to-video generation started"
         }
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -119,6 +121,8 @@ async def generate_talking_avatar(
             "estimated_time": 180,
             "model": model
         }
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -166,6 +170,8 @@ async def clone_voice(
             "estimated_time": 60,
             "model": model
         }
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -205,6 +211,8 @@ async def generate_3d_model(
             "estimated_time": 120,
             "model": model
         }
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -248,6 +256,8 @@ async def upscale_image(
             "estimated_time": 30,
             "model": model
         }
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -283,6 +293,8 @@ async def remove_background(
             "estimated_time": 15,
             "model": model
         }
+    except TaskQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -83,8 +83,9 @@ class ResultStorage:
         """Store a file and return storage information"""
         
         # Validate file size
-        if len(file_data) > self.max_file_size:
-            raise ValueError(f"File size {len(file_data)} exceeds maximum {self.max_file_size}")
+        file_size = len(file_data)
+        if file_size > self.max_file_size:
+            raise ValueError(f"File size {file_size} exceeds maximum {self.max_file_size}")
         
         # Generate unique file ID
         file_id = self._generate_file_id(filename, user_id)
@@ -123,13 +124,17 @@ class ResultStorage:
                 except Exception as e:
                     logger.warning(f"Failed to store file in cloud: {e}")
             
+            # Drop our reference to the payload so it can be reclaimed
+            # before the record is built and the request unwinds
+            del file_data
+            
             # Create stored file record
             stored_file = StoredFile(
                 file_id=file_id,
                 original_name=filename,
                 stored_path=stored_path,
                 public_url=public_url,
-                file_size=len(file_data),
+                file_size=file_size,
                 mime_type=mime_type,
                 checksum=checksum,
                 user_id=user_id,
@@ -4,19 +4,153 @@ Handles security policies, rate limiting, input validation, and threat detection
 """
 
 import asyncio
+import os
 import time
+import uuid
 import re
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Set
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Set, Deque, Tuple
 from dataclasses import dataclass
-from collections import defaultdict, deque
+from collections import Counter, OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
 from enum import Enum
+import bisect
+import functools
 import hashlib
 import ipaddress
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:  # Optional C accelerator for keyword matching
+    ahocorasick = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis is only needed for limits shared across workers
+    aioredis = None
+
+try:
+    import hyperscan
+except ImportError:  # Optional DFA engine for multi-pattern scanning
+    hyperscan = None
 
 logger = logging.getLogger(__name__)
 
+def _is_word_char(char: str) -> bool:
+    """Match the re module's notion of a \\w character"""
+    return char.isalnum() or char == "_"
+
+# Atomic groups and possessive quantifiers, which only restrict backtracking
+_ATOMIC_GROUP_RE = re.compile(r"(?<!\\)\(\?>")
+_POSSESSIVE_RE = re.compile(r"(?<!\\)([*+?}])\+")
+
+# Translation table that deletes characters not allowed in uploaded filenames
+_INVALID_FILENAME_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+
+# Upload extensions (without the dot) and the content type each must be sent with
+_ALLOWED_UPLOAD_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'mp4', 'mp3', 'wav', 'txt', 'py', 'js'})
+_EXPECTED_CONTENT_TYPES = {
+    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png',
+    'gif': 'image/gif', 'mp4': 'video/mp4', 'mp3': 'audio/mpeg',
+    'wav': 'audio/wav', 'txt': 'text/plain'
+}
+
+# U+0130 is the only character whose lowercase form is longer (it gains a
+# combining dot); map it the way re.IGNORECASE does so word boundaries hold
+_SIMPLE_LOWERCASE = str.maketrans({"\u0130": "i"})
+
+def _lowercase_for_regex(text: str, lower: str) -> str:
+    """Given text and text.lower(), lowercase text the way re.IGNORECASE folds it"""
+    if len(lower) != len(text):
+        lower = text.translate(_SIMPLE_LOWERCASE).lower()
+    return lower
+
+@functools.lru_cache(maxsize=65536)
+def _classify_ip(ip: str) -> Optional[Tuple[bool, bool]]:
+    """Return (is_private, is_loopback) for an address, or None if it is invalid"""
+    try:
+        ip_obj = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    return ip_obj.is_private, ip_obj.is_loopback
+
+@functools.lru_cache(maxsize=65536)
+def _parse_ip(ip: str) -> Optional[Tuple[int, int]]:
+    """Return (version, integer value) for an address, or None if it is invalid"""
+    try:
+        ip_obj = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    return ip_obj.version, int(ip_obj)
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """Sort (start, end) ranges and merge overlaps into disjoint start/end lists"""
+    starts, ends = [], []
+    for start, end in sorted(ranges):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+def _compile_alternation(patterns, flags=0):
+    """Fuse a group of patterns into one regex so a single scan covers them all"""
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags)
+
+class ThreatScanner:
+    """Scan text against labelled pattern groups and report every label that matches
+    
+    Patterns are written in lowercase and matched case-sensitively against
+    lowercased text, so neither engine has to fold case while scanning.
+    """
+    
+    def __init__(self, groups):
+        self.labels = [label for label, _ in groups]
+        self.patterns = [(label, _compile_alternation(patterns)) for label, patterns in groups]
+        self.database = self._compile_database(groups) if hyperscan else None
+    
+    def _compile_database(self, groups):
+        """Compile all groups into one Hyperscan database, or None if unsupported"""
+        expressions, ids = [], []
+        for index, (_, patterns) in enumerate(groups):
+            for pattern in patterns:
+                # Hyperscan never backtracks and rejects backtracking controls,
+                # so patterns must match the same inputs without them
+                pattern = _ATOMIC_GROUP_RE.sub("(?:", pattern)
+                pattern = _POSSESSIVE_RE.sub(r"\1", pattern)
+                expressions.append(pattern.encode())
+                ids.append(index)
+        
+        try:
+            database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            database.compile(
+                expressions=expressions,
+                ids=ids,
+                elements=len(expressions),
+                flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(expressions)
+            )
+            return database
+        except hyperscan.error as e:
+            logger.warning(f"Hyperscan compile failed, falling back to re: {e}")
+            return None
+    
+    def scan(self, text: str) -> Set[str]:
+        """Return the labels of all groups with a pattern matching lowercased text"""
+        # Hyperscan's \b and \w are ASCII-only, so it only handles ASCII input
+        if self.database is not None and text.isascii():
+            matched = set()
+            
+            def on_match(pattern_id, start, end, flags, context):
+                matched.add(self.labels[pattern_id])
+            
+            self.database.scan(text.encode("ascii"), match_event_handler=on_match)
+            return matched
+        
+        return {label for label, pattern in self.patterns if pattern.search(text)}
+
 class ThreatLevel(Enum):
     LOW = "low"
     MEDIUM = "medium" 
@@ -39,8 +173,21 @@ class SecurityEvent:
     user_id: Optional[str]
     user_agent: Optional[str]
     description: str
-    timestamp: datetime
+    timestamp: float  # Unix time
     metadata: Dict[str, Any]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "event_id": self.event_id,
+            "event_type": self.event_type,
+            "threat_level": self.threat_level.value,
+            "ip_address": self.ip_address,
+            "user_id": self.user_id,
+            "user_agent": self.user_agent,
+            "description": self.description,
+            "timestamp": datetime.utcfromtimestamp(self.timestamp).isoformat(),
+            "metadata": self.metadata
+        }
 
 @dataclass
 class RateLimitRule:
@@ -50,14 +197,139 @@ class RateLimitRule:
     burst_limit: Optional[int] = None
     block_duration_seconds: int = 300  # 5 minutes default
 
+class LRUDefaultDict(OrderedDict):
+    """defaultdict capped at maxlen keys, evicting the least recently used
+    
+    Keeps per-IP/per-user tracking bounded when an attacker rotates through
+    large numbers of addresses.
+    """
+    
+    def __init__(self, maxlen: int, default_factory=None):
+        super().__init__()
+        self.maxlen = maxlen
+        self.default_factory = default_factory
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxlen:
+            self.popitem(last=False)
+    
+    def __missing__(self, key):
+        if self.default_factory is None:
+            raise KeyError(key)
+        self[key] = value = self.default_factory()
+        return value
+
+class IPRangeSet:
+    """Set of IP addresses and CIDR networks with O(log N) membership checks
+    
+    Networks are kept as sorted, disjoint integer ranges: numpy arrays for
+    IPv4 and plain lists for IPv6, which does not fit in a machine integer.
+    Lookups binary-search for the last range starting at or below the address.
+    """
+    
+    def __init__(self, networks=()):
+        self._v4_starts = np.empty(0, dtype=np.int64)
+        self._v4_ends = np.empty(0, dtype=np.int64)
+        self._v6_starts: List[int] = []
+        self._v6_ends: List[int] = []
+        self.update(networks)
+    
+    def add(self, network: str):
+        """Add a single address or CIDR network, merged in place with the ranges it overlaps
+        
+        Called on the request path (block_ip), so it splices one range in rather
+        than rebuilding and re-merging every range like update() does.
+        """
+        net = ipaddress.ip_network(network, strict=False)
+        start, end = int(net.network_address), int(net.broadcast_address)
+        
+        # Ranges lo..hi-1 are the ones overlapping start..end; none if lo == hi
+        if net.version == 4:
+            starts, ends = self._v4_starts, self._v4_ends
+            lo = int(np.searchsorted(ends, start, side="left"))
+            hi = int(np.searchsorted(starts, end, side="right"))
+        else:
+            starts, ends = self._v6_starts, self._v6_ends
+            lo = bisect.bisect_left(ends, start)
+            hi = bisect.bisect_right(starts, end)
+        
+        if lo < hi:
+            if hi - lo == 1 and starts[lo] <= start and end <= ends[lo]:
+                return  # Already covered
+            start = min(start, int(starts[lo]))
+            end = max(end, int(ends[hi - 1]))
+        
+        if net.version == 4:
+            self._v4_starts = np.concatenate((starts[:lo], np.array([start], dtype=np.int64), starts[hi:]))
+            self._v4_ends = np.concatenate((ends[:lo], np.array([end], dtype=np.int64), ends[hi:]))
+        else:
+            starts[lo:hi] = [start]
+            ends[lo:hi] = [end]
+    
+    def update(self, networks):
+        """Add addresses or CIDR networks, e.g. from a threat intelligence feed"""
+        v4 = list(zip(self._v4_starts.tolist(), self._v4_ends.tolist()))
+        v6 = list(zip(self._v6_starts, self._v6_ends))
+        for network in networks:
+            net = ipaddress.ip_network(network, strict=False)
+            ranges = v4 if net.version == 4 else v6
+            ranges.append((int(net.network_address), int(net.broadcast_address)))
+        
+        v4_starts, v4_ends = _merge_ranges(v4)
+        self._v4_starts = np.array(v4_starts, dtype=np.int64)
+        self._v4_ends = np.array(v4_ends, dtype=np.int64)
+        self._v6_starts, self._v6_ends = _merge_ranges(v6)
+    
+    def __contains__(self, ip: str) -> bool:
+        parsed = _parse_ip(ip)
+        if parsed is None:
+            return False
+        
+        version, value = parsed
+        if version == 4:
+            index = int(np.searchsorted(self._v4_starts, value, side="right")) - 1
+            return index >= 0 and value <= self._v4_ends[index]
+        
+        index = bisect.bisect_right(self._v6_starts, value) - 1
+        return index >= 0 and value <= self._v6_ends[index]
+    
+    def __len__(self) -> int:
+        """Number of disjoint ranges held"""
+        return len(self._v4_starts) + len(self._v6_starts)
+
+class RequestRing:
+    """Fixed-size ring buffer of request timestamps for a single IP or user"""
+    __slots__ = ("timestamps", "head")
+    
+    def __init__(self, capacity: int):
+        # Unused slots hold -inf so they always fall outside any window
+        self.timestamps = np.full(capacity, -np.inf)
+        self.head = 0
+    
+    def record(self, timestamp: float):
+        """Record a request, overwriting the oldest slot once the ring is full"""
+        self.timestamps[self.head % len(self.timestamps)] = timestamp
+        self.head += 1
+    
+    def count_since(self, window_start: float) -> int:
+        """Count recorded requests at or after window_start"""
+        # The ring is two sorted runs: older entries after the head, newer before it
+        split = self.head % len(self.timestamps)
+        older, newer = self.timestamps[split:], self.timestamps[:split]
+        return (
+            len(older) - int(np.searchsorted(older, window_start)) +
+            len(newer) - int(np.searchsorted(newer, window_start))
+        )
+
 class RateLimiter:
     def __init__(self):
-        # Track requests per IP/user
-        self.ip_requests: Dict[str, deque] = defaultdict(deque)
-        self.user_requests: Dict[str, deque] = defaultdict(deque)
-        self.blocked_ips: Dict[str, float] = {}  # IP -> unblock_time
-        self.blocked_users: Dict[str, float] = {}  # user_id -> unblock_time
-        
         # Default rate limiting rules
         self.rules = {
             "api_general": RateLimitRule("api_general", 100, 3600, 10, 300),  # 100/hour, burst 10
@@ -65,6 +337,22 @@ class RateLimiter:
             "generation": RateLimitRule("generation", 10, 60, 3, 120),  # 10 generations per minute
             "upload": RateLimitRule("upload", 20, 3600, 5, 600),  # 20 uploads per hour
         }
+        
+        # Rings only need to hold as many requests as the largest limit checks
+        self.ring_capacity = max(
+            max(rule.requests_per_window, rule.burst_limit or 0) for rule in self.rules.values()
+        )
+        
+        # Track requests per IP/user, bounded to the most recently seen keys
+        self.max_tracked_keys = 100_000
+        self.ip_requests: Dict[str, RequestRing] = LRUDefaultDict(
+            self.max_tracked_keys, lambda: RequestRing(self.ring_capacity)
+        )
+        self.user_requests: Dict[str, RequestRing] = LRUDefaultDict(
+            self.max_tracked_keys, lambda: RequestRing(self.ring_capacity)
+        )
+        self.blocked_ips: Dict[str, float] = LRUDefaultDict(self.max_tracked_keys)  # IP -> unblock_time
+        self.blocked_users: Dict[str, float] = LRUDefaultDict(self.max_tracked_keys)  # user_id -> unblock_time
     
     def is_blocked(self, ip: str, user_id: str = None) -> bool:
         """Check if IP or user is currently blocked"""
@@ -98,9 +386,9 @@ class RateLimiter:
         now = time.time()
         window_start = now - rule.window_seconds
         
-        # Clean old requests and count current requests
-        ip_count = self._count_requests(self.ip_requests[ip], window_start, now)
-        user_count = self._count_requests(self.user_requests[user_id or ""], window_start, now) if user_id else 0
+        # Count current requests
+        ip_count = self.ip_requests[ip].count_since(window_start)
+        user_count = self.user_requests[user_id or ""].count_since(window_start) if user_id else 0
         
         # Check against limits
         max_count = max(ip_count, user_count)
@@ -108,8 +396,8 @@ class RateLimiter:
         # Check burst limit first
         if rule.burst_limit and max_count >= rule.burst_limit:
             recent_window = now - 60  # Last minute
-            recent_ip_count = self._count_requests(self.ip_requests[ip], recent_window, now)
-            recent_user_count = self._count_requests(self.user_requests[user_id or ""], recent_window, now) if user_id else 0
+            recent_ip_count = self.ip_requests[ip].count_since(recent_window)
+            recent_user_count = self.user_requests[user_id or ""].count_since(recent_window) if user_id else 0
             
             if max(recent_ip_count, recent_user_count) >= rule.burst_limit:
                 self._block_temporarily(ip, user_id, rule.block_duration_seconds)
@@ -120,19 +408,15 @@ class RateLimiter:
             return SecurityAction.RATE_LIMIT
         
         # Record this request
-        self.ip_requests[ip].append(now)
+        self.ip_requests[ip].record(now)
         if user_id:
-            self.user_requests[user_id].append(now)
+            self.user_requests[user_id].record(now)
         
         return SecurityAction.ALLOW
     
-    def _count_requests(self, request_queue: deque, window_start: float, now: float) -> int:
-        """Count requests in the current window and clean old ones"""
-        # Remove old requests
-        while request_queue and request_queue[0] < window_start:
-            request_queue.popleft()
-        
-        return len(request_queue)
+    async def check_rate_limit_async(self, rule_name: str, ip: str, user_id: str = None) -> SecurityAction:
+        """Async entry point so callers work with in-process and shared limiters alike"""
+        return self.check_rate_limit(rule_name, ip, user_id)
     
     def _block_temporarily(self, ip: str, user_id: str = None, duration: int = 300):
         """Block IP/user temporarily"""
@@ -144,31 +428,135 @@ class RateLimiter:
         
         logger.warning(f"Temporarily blocked IP {ip}" + (f" and user {user_id}" if user_id else ""))
 
+# Sliding-window check over one or two (block key, window key) pairs.
+# Returns 0 to allow, 1 to rate limit and 2 when blocked.
+_SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local burst = tonumber(ARGV[4])
+local block_seconds = tonumber(ARGV[5])
+local member = ARGV[6]
+
+for i = 1, #KEYS, 2 do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        return 2
+    end
+end
+
+local max_count = 0
+for i = 2, #KEYS, 2 do
+    redis.call('ZREMRANGEBYSCORE', KEYS[i], '-inf', '(' .. (now - window))
+    max_count = math.max(max_count, redis.call('ZCARD', KEYS[i]))
+end
+
+if burst > 0 and max_count >= burst then
+    local recent = 0
+    for i = 2, #KEYS, 2 do
+        recent = math.max(recent, redis.call('ZCOUNT', KEYS[i], now - 60, '+inf'))
+    end
+    if recent >= burst then
+        for i = 1, #KEYS, 2 do
+            redis.call('SET', KEYS[i], 1, 'EX', block_seconds)
+        end
+        return 2
+    end
+end
+
+if max_count >= limit then
+    return 1
+end
+
+for i = 2, #KEYS, 2 do
+    redis.call('ZADD', KEYS[i], now, member)
+    redis.call('EXPIRE', KEYS[i], window)
+end
+return 0
+"""
+
+class RedisRateLimiter(RateLimiter):
+    """Sliding-window rate limiter whose state lives in Redis sorted sets
+    
+    Limits are enforced atomically by a Lua script, so they hold across workers
+    and replicas and survive restarts. Falls back to the in-process limiter if
+    Redis is unreachable.
+    """
+    
+    def __init__(self, redis_client):
+        super().__init__()
+        self.redis = redis_client
+        self.sliding_window = redis_client.register_script(_SLIDING_WINDOW_LUA)
+    
+    async def check_rate_limit_async(self, rule_name: str, ip: str, user_id: str = None) -> SecurityAction:
+        """Check and record a request against the shared sliding window"""
+        if rule_name not in self.rules:
+            return SecurityAction.ALLOW
+        
+        rule = self.rules[rule_name]
+        keys = [f"rl:block:ip:{ip}", f"rl:{rule_name}:ip:{ip}"]
+        if user_id:
+            keys += [f"rl:block:user:{user_id}", f"rl:{rule_name}:user:{user_id}"]
+        
+        try:
+            result = await self.sliding_window(
+                keys=keys,
+                args=[
+                    time.time(),
+                    rule.window_seconds,
+                    rule.requests_per_window,
+                    rule.burst_limit or 0,
+                    rule.block_duration_seconds,
+                    uuid.uuid4().hex,
+                ]
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, using in-process limits: {e}")
+            return self.check_rate_limit(rule_name, ip, user_id)
+        
+        if result == 2:
+            return SecurityAction.BLOCK_TEMPORARY
+        if result == 1:
+            return SecurityAction.RATE_LIMIT
+        return SecurityAction.ALLOW
+
 class InputValidator:
+    max_text_length = 10000
+    
     def __init__(self):
-        # Dangerous patterns to detect
-        self.sql_injection_patterns = [
-            r"(\bUNION\b|\bSELECT\b|\bINSERT\b|\bUPDATE\b|\bDELETE\b|\bDROP\b)",
-            r"[\'\";].*(\bOR\b|\bAND\b).*[\'\";]",
+        # Dangerous patterns to detect, in lowercase. Atomic groups and possessive quantifiers
+        # keep re from backtracking catastrophically on adversarial input
+        self.sql_injection_patterns = (
+            r"(\bunion\b|\bselect\b|\binsert\b|\bupdate\b|\bdelete\b|\bdrop\b)",
+            r"[\'\";](?>[^\'\";\n]*?(\bor\b|\band\b))[^\'\";\n]*+[\'\";]",
             r"[\'\"];.*--"
-        ]
+        )
         
-        self.xss_patterns = [
-            r"<script[^>]*>.*?</script>",
+        self.xss_patterns = (
+            r"<script[^>]*+>.*?</script>",
             r"javascript:",
-            r"on\w+\s*=",
-            r"<iframe[^>]*>",
-            r"<object[^>]*>",
-            r"<embed[^>]*>"
-        ]
+            r"\b(?>\w*?on\w)\w*+\s*+=",
+            r"<iframe[^>]*+>",
+            r"<object[^>]*+>",
+            r"<embed[^>]*+>"
+        )
         
-        self.command_injection_patterns = [
+        self.command_injection_patterns = (
             r"[;&|`$]",
-            r"\b(rm|ls|cat|wget|curl|nc|telnet|ssh)\b",
             r"\.\.\/",
-            r"\$\([^)]*\)",
+            r"\$\([^)]*+\)",
             r"`[^`]*`"
-        ]
+        )
+        
+        # All injection patterns are matched in one scan; keyword categories
+        # that also trigger a threat are listed alongside it
+        self.threat_scanner = ThreatScanner([
+            ("Potential SQL injection detected", self.sql_injection_patterns),
+            ("Potential XSS attack detected", self.xss_patterns),
+            ("Potential command injection detected", self.command_injection_patterns),
+        ])
+        self.threat_keywords = {"Potential command injection detected": "command"}
+        
+        self.word_pattern = re.compile(r'\b\w+\b')
         
         # Content filtering
         self.profanity_words = set([
@@ -180,42 +568,93 @@ class InputValidator:
             "hack", "exploit", "vulnerability", "backdoor", "malware",
             "virus", "trojan", "phishing", "spam", "ddos"
         ])
+        
+        # Shell commands are matched as whole words alongside the dictionaries above
+        self.shell_commands = set([
+            "rm", "ls", "cat", "wget", "curl", "nc", "telnet", "ssh"
+        ])
+        
+        self.keyword_automaton = self._build_keyword_automaton() if ahocorasick else None
+    
+    def _build_keyword_automaton(self):
+        """Build one Aho-Corasick automaton over all fixed-string dictionaries"""
+        categories_by_word = defaultdict(list)
+        for category, words in (
+            ("profanity", self.profanity_words),
+            ("command", self.shell_commands),
+            ("suspicious", self.suspicious_keywords),
+        ):
+            for word in words:
+                categories_by_word[word.lower()].append(category)
+        
+        automaton = ahocorasick.Automaton()
+        for word, categories in categories_by_word.items():
+            automaton.add_word(word, (tuple(categories), len(word)))
+        automaton.make_automaton()
+        return automaton
     
-    def validate_text_input(self, text: str, max_length: int = 10000) -> Dict[str, Any]:
+    def _match_keywords(self, text_lower: str) -> Set[str]:
+        """Return the keyword categories (profanity, command, suspicious) found in text"""
+        found = set()
+        
+        if self.keyword_automaton is not None:
+            # Single linear scan; profanity and commands must match whole words
+            for end, (categories, length) in self.keyword_automaton.iter(text_lower):
+                start = end - length + 1
+                whole_word = (
+                    (start == 0 or not _is_word_char(text_lower[start - 1])) and
+                    (end + 1 == len(text_lower) or not _is_word_char(text_lower[end + 1]))
+                )
+                for category in categories:
+                    if whole_word or category == "suspicious":
+                        found.add(category)
+            return found
+        
+        words = set(self.word_pattern.findall(text_lower))
+        if words & self.profanity_words:
+            found.add("profanity")
+        if words & self.shell_commands:
+            found.add("command")
+        if any(keyword in text_lower for keyword in self.suspicious_keywords):
+            found.add("suspicious")
+        return found
+    
+    def validate_text_input(self, text: str, max_length: Optional[int] = None) -> Dict[str, Any]:
         """Validate text input for security threats"""
         if not text:
             return {"valid": True, "threats": []}
         
+        if max_length is None:
+            max_length = self.max_text_length
+        
+        # Length is checked before any lowercasing or regex work
         if len(text) > max_length:
             return {"valid": False, "threats": ["Text exceeds maximum length"]}
         
         threats = []
         
-        # Check for SQL injection
-        for pattern in self.sql_injection_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                threats.append("Potential SQL injection detected")
-                break
-        
-        # Check for XSS
-        for pattern in self.xss_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                threats.append("Potential XSS attack detected")
-                break
-        
-        # Check for command injection
-        for pattern in self.command_injection_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                threats.append("Potential command injection detected")
-                break
+        # Every check below runs against a single lowercased copy
+        lower = text.lower()
+        folded = _lowercase_for_regex(text, lower)
+        keywords = self._match_keywords(lower)
+        if folded is not lower:
+            # Shell command names follow re.IGNORECASE word boundaries, like the regexes
+            keywords.discard("command")
+            if set(self.word_pattern.findall(folded)) & self.shell_commands:
+                keywords.add("command")
+        matched = self.threat_scanner.scan(folded)
+        
+        # Check for SQL injection, XSS and command injection
+        for threat in self.threat_scanner.labels:
+            if threat in matched or self.threat_keywords.get(threat) in keywords:
+                threats.append(threat)
         
         # Check for profanity
-        words = re.findall(r'\b\w+\b', text.lower())
-        if any(word in self.profanity_words for word in words):
+        if "profanity" in keywords:
             threats.append("Inappropriate content detected")
         
         # Check for suspicious keywords
-        if any(keyword in text.lower() for keyword in self.suspicious_keywords):
+        if "suspicious" in keywords:
             threats.append("Suspicious keywords detected")
         
         return {
@@ -229,18 +668,19 @@ class InputValidator:
         threats = []
         
         # Check file extension
-        allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.mp4', '.mp3', '.wav', '.txt', '.py', '.js'}
-        file_ext = filename.lower().split('.')[-1] if '.' in filename else ""
+        _, dot, file_ext = filename.lower().rpartition('.')
+        if not dot:
+            file_ext = ""
         
-        if f".{file_ext}" not in allowed_extensions:
+        if file_ext not in _ALLOWED_UPLOAD_EXTENSIONS:
             threats.append(f"File extension .{file_ext} not allowed")
         
         # Check for double extensions (e.g., .jpg.exe)
-        if filename.count('.') > 1:
+        if filename.find('.', filename.find('.') + 1) > 0:
             threats.append("Multiple file extensions detected")
         
         # Check filename for suspicious patterns
-        if re.search(r'[<>:"/\\|?*]', filename):
+        if len(filename.translate(_INVALID_FILENAME_CHARS)) != len(filename):
             threats.append("Filename contains invalid characters")
         
         # Check file size (100MB limit)
@@ -248,13 +688,7 @@ class InputValidator:
             threats.append("File size exceeds maximum limit")
         
         # Check content type mismatch
-        expected_types = {
-            'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png',
-            'gif': 'image/gif', 'mp4': 'video/mp4', 'mp3': 'audio/mpeg',
-            'wav': 'audio/wav', 'txt': 'text/plain'
-        }
-        
-        expected_type = expected_types.get(file_ext)
+        expected_type = _EXPECTED_CONTENT_TYPES.get(file_ext)
         if expected_type and content_type != expected_type:
             threats.append("Content type doesn't match file extension")
         
@@ -264,23 +698,142 @@ class InputValidator:
             "threat_level": ThreatLevel.HIGH.value if threats else ThreatLevel.LOW.value
         }
 
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when a caller already has the maximum number of requests in flight"""
+
+class ConcurrentLimiter:
+    """Caps how many requests one user or IP may have in flight per rule
+    
+    Complements the frequency limits: a handful of slow generation or upload
+    requests opened in parallel can tie up workers without ever exceeding QPS.
+    Inflight entries live in Redis sorted sets when a client is given, so the
+    cap holds across workers; entries older than stale_seconds are treated as
+    leaked by a crashed worker and ignored.
+    """
+    
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.max_concurrent = {
+            "generation": 3,
+            "upload": 5,
+        }
+        self.stale_seconds = 30
+        self.inflight: Dict[str, Dict[str, float]] = defaultdict(dict)  # key -> token -> start time
+    
+    async def acquire(self, identity: str, rule_name: str) -> Optional[str]:
+        """Reserve an inflight slot, returning a release token or None if at capacity"""
+        limit = self.max_concurrent.get(rule_name)
+        if limit is None:
+            return ""
+        
+        key = f"cc:{rule_name}:{identity}"
+        token = uuid.uuid4().hex
+        now = time.time()
+        
+        if self.redis is not None:
+            try:
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.zadd(key, {token: now})
+                    pipe.zremrangebyscore(key, "-inf", now - self.stale_seconds)
+                    pipe.zcard(key)
+                    pipe.expire(key, self.stale_seconds)
+                    _, _, count, _ = await pipe.execute()
+                if count > limit:
+                    await self.redis.zrem(key, token)
+                    return None
+                return token
+            except Exception as e:
+                logger.warning(f"Redis concurrency limiter unavailable, using in-process limits: {e}")
+        
+        inflight = self.inflight[key]
+        for stale_token in [t for t, started in inflight.items() if started < now - self.stale_seconds]:
+            del inflight[stale_token]
+        if len(inflight) >= limit:
+            return None
+        inflight[token] = now
+        return token
+    
+    async def release(self, identity: str, rule_name: str, token: str):
+        """Release a slot previously returned by acquire"""
+        if not token:
+            return
+        
+        key = f"cc:{rule_name}:{identity}"
+        inflight = self.inflight.get(key)
+        if inflight is not None and inflight.pop(token, None) is not None:
+            if not inflight:
+                del self.inflight[key]
+            return
+        
+        if self.redis is not None:
+            try:
+                await self.redis.zrem(key, token)
+            except Exception as e:
+                logger.warning(f"Failed to release concurrency slot {key}: {e}")
+
+def _create_redis_client():
+    """Connect to Redis when REDIS_URL is configured and the client is installed"""
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url and aioredis is not None:
+        return aioredis.from_url(redis_url)
+    return None
+
+def _create_rate_limiter(redis_client=None) -> RateLimiter:
+    """Use Redis-backed limits when a client is available, else in-process ones"""
+    if redis_client is not None:
+        return RedisRateLimiter(redis_client)
+    return RateLimiter()
+
 class SecurityManager:
+    # Prompt checks run on every generation request, so compile them once
+    _PROMPT_SCANNER = ThreatScanner([
+        ("Potential AI manipulation attempt detected", (
+            r"ignore previous instructions",
+            r"pretend you are",
+            r"roleplay as",
+            r"forget everything",
+            r"new instructions:",
+            r"system prompt:",
+            r"developer mode"
+        )),
+        ("Request for harmful content detected", (
+            r"how to make.*(?:bomb|explosive|weapon)",
+            r"illegal.*(?:drugs|activities|hacking)",
+            r"personal information.*(?:steal|extract|obtain)",
+            r"bypass.*(?:security|authentication|protection)"
+        )),
+    ])
+    
+    _FILTER_RE = re.compile(
+        r"(?:ignore previous instructions|pretend you are|roleplay as).*", re.IGNORECASE
+    )
+    
     def __init__(self):
-        self.rate_limiter = RateLimiter()
+        redis_client = _create_redis_client()
+        self.rate_limiter = _create_rate_limiter(redis_client)
+        self.concurrent_limiter = ConcurrentLimiter(redis_client)
         self.input_validator = InputValidator()
-        self.security_events: List[SecurityEvent] = []
-        self.blocked_ips: Set[str] = set()
+        self.security_events: Deque[SecurityEvent] = deque(maxlen=1000)  # Most recent events
+        self._event_history: Deque[Tuple[float, ThreatLevel]] = deque(maxlen=100_000)  # Last day, for stats
+        self._history_levels: Counter = Counter()  # Threat level tally of _event_history
+        self.blocked_ips = IPRangeSet()
         self.trusted_ips: Set[str] = set()
         
         # Security configuration
         self.max_failed_attempts = 5
         self.lockout_duration = 900  # 15 minutes
-        self.failed_attempts: Dict[str, List[datetime]] = defaultdict(list)
+        self.failed_attempts: Dict[str, Deque[float]] = LRUDefaultDict(100_000, deque)  # monotonic times
         
         # Threat detection patterns
         self.suspicious_user_agents = [
             "bot", "crawler", "spider", "scraper", "scanner"
         ]
+        self._suspicious_user_agent_re = re.compile(
+            "|".join(re.escape(pattern) for pattern in self.suspicious_user_agents)
+        )
+        
+        # Clients send a small set of distinct user agents, so memoize verdicts
+        self._user_agent_verdicts = functools.lru_cache(maxsize=4096)(self._classify_user_agent)
     
     async def check_request_security(
         self, 
@@ -296,10 +849,10 @@ class SecurityManager:
         rule_name = self._get_rate_limit_rule(endpoint)
         
         # Check rate limiting
-        rate_limit_action = self.rate_limiter.check_rate_limit(rule_name, ip, user_id)
+        rate_limit_action = await self.rate_limiter.check_rate_limit_async(rule_name, ip, user_id)
         
         if rate_limit_action != SecurityAction.ALLOW:
-            await self._log_security_event(
+            self._log_security_event(
                 "rate_limit_exceeded",
                 ThreatLevel.MEDIUM,
                 ip, user_id, user_agent,
@@ -313,8 +866,8 @@ class SecurityManager:
             }
         
         # Check IP reputation
-        if await self._is_suspicious_ip(ip):
-            await self._log_security_event(
+        if self._is_suspicious_ip(ip):
+            self._log_security_event(
                 "suspicious_ip",
                 ThreatLevel.HIGH,
                 ip, user_id, user_agent,
@@ -328,8 +881,8 @@ class SecurityManager:
             }
         
         # Check user agent
-        if user_agent and await self._is_suspicious_user_agent(user_agent):
-            await self._log_security_event(
+        if user_agent and self._is_suspicious_user_agent(user_agent):
+            self._log_security_event(
                 "suspicious_user_agent",
                 ThreatLevel.MEDIUM,
                 ip, user_id, user_agent,
@@ -339,9 +892,9 @@ class SecurityManager:
         
         # Validate request data if provided
         if request_data:
-            validation_result = await self._validate_request_data(request_data)
+            validation_result = self._validate_request_data(request_data)
             if not validation_result["valid"]:
-                await self._log_security_event(
+                self._log_security_event(
                     "malicious_input",
                     ThreatLevel.HIGH,
                     ip, user_id, user_agent,
@@ -360,32 +913,59 @@ class SecurityManager:
             "reason": "Request passed security checks"
         }
     
+    @asynccontextmanager
+    async def request_guard(self, endpoint: str, ip: str, user_id: str = None):
+        """Hold an inflight slot for the duration of a request
+        
+        Raises ConcurrencyLimitExceeded if the caller already has too many
+        requests in flight for this endpoint's rule.
+        """
+        rule_name = self._get_rate_limit_rule(endpoint)
+        identity = f"user:{user_id}" if user_id else f"ip:{ip}"
+        
+        token = await self.concurrent_limiter.acquire(identity, rule_name)
+        if token is None:
+            self._log_security_event(
+                "concurrency_limit_exceeded",
+                ThreatLevel.MEDIUM,
+                ip, user_id, None,
+                f"Too many concurrent requests for {endpoint}",
+                {"endpoint": endpoint, "rule": rule_name}
+            )
+            raise ConcurrencyLimitExceeded(f"Too many concurrent requests for {rule_name}")
+        
+        try:
+            yield
+        finally:
+            await self.concurrent_limiter.release(identity, rule_name, token)
+    
     async def record_failed_login(self, identifier: str, ip: str):
         """Record failed login attempt"""
-        now = datetime.utcnow()
+        now = time.monotonic()
+        attempts = self.failed_attempts[identifier]
         
         # Clean old attempts (older than 1 hour)
-        cutoff = now - timedelta(hours=1)
-        self.failed_attempts[identifier] = [
-            attempt for attempt in self.failed_attempts[identifier]
-            if attempt > cutoff
-        ]
+        cutoff = now - 3600
+        while attempts and attempts[0] <= cutoff:
+            attempts.popleft()
         
         # Record this attempt
-        self.failed_attempts[identifier].append(now)
+        attempts.append(now)
         
         # Check if should be locked out
-        if len(self.failed_attempts[identifier]) >= self.max_failed_attempts:
-            await self._log_security_event(
+        if len(attempts) >= self.max_failed_attempts:
+            self._log_security_event(
                 "brute_force_attempt",
                 ThreatLevel.HIGH,
                 ip, None, None,
                 f"Multiple failed login attempts for {identifier}",
-                {"attempts": len(self.failed_attempts[identifier])}
+                {"attempts": len(attempts)}
             )
             
-            # Block IP temporarily
-            self.blocked_ips.add(ip)
+            # Block IP temporarily. The client host is not always an address (test
+            # clients, some proxies); the account is still locked without the block
+            if _parse_ip(ip) is not None:
+                self.blocked_ips.add(ip)
             
             return True  # Account should be locked
         
@@ -398,34 +978,10 @@ class SecurityManager:
         # Additional prompt-specific checks
         threats = validation.get("threats", [])
         
-        # Check for attempts to jailbreak or manipulate AI
-        jailbreak_patterns = [
-            r"ignore previous instructions",
-            r"pretend you are",
-            r"roleplay as",
-            r"forget everything",
-            r"new instructions:",
-            r"system prompt:",
-            r"developer mode"
-        ]
-        
-        for pattern in jailbreak_patterns:
-            if re.search(pattern, prompt, re.IGNORECASE):
-                threats.append("Potential AI manipulation attempt detected")
-                break
-        
-        # Check for requests for harmful content
-        harmful_patterns = [
-            r"how to make.*(?:bomb|explosive|weapon)",
-            r"illegal.*(?:drugs|activities|hacking)",
-            r"personal information.*(?:steal|extract|obtain)",
-            r"bypass.*(?:security|authentication|protection)"
-        ]
-        
-        for pattern in harmful_patterns:
-            if re.search(pattern, prompt, re.IGNORECASE):
-                threats.append("Request for harmful content detected")
-                break
+        # Check for attempts to jailbreak or manipulate AI, and for requests
+        # for harmful content
+        matched = self._PROMPT_SCANNER.scan(_lowercase_for_regex(prompt, prompt.lower()))
+        threats.extend(label for label in self._PROMPT_SCANNER.labels if label in matched)
         
         return {
             "valid": len(threats) == 0,
@@ -436,20 +992,22 @@ class SecurityManager:
     
     def _filter_prompt(self, prompt: str) -> str:
         """Filter and sanitize prompt"""
-        # Remove potential harmful instructions
-        filtered = re.sub(r"ignore previous instructions.*", "", prompt, flags=re.IGNORECASE)
-        filtered = re.sub(r"pretend you are.*", "", filtered, flags=re.IGNORECASE)
-        filtered = re.sub(r"roleplay as.*", "", filtered, flags=re.IGNORECASE)
-        
-        return filtered.strip()
+        # Remove potential harmful instructions (each up to the end of its line)
+        return self._FILTER_RE.sub("", prompt).strip()
     
-    async def _validate_request_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _validate_request_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate request data for security threats"""
         all_threats = []
         
+        max_length = self.input_validator.max_text_length
         for key, value in data.items():
-            if isinstance(value, str):
-                validation = self.input_validator.validate_text_input(value)
+            # Only non-empty strings can carry an injection payload
+            if isinstance(value, str) and value:
+                # Oversized fields are rejected without lowercasing or scanning them
+                if len(value) > max_length:
+                    all_threats.append(f"{key}: Text exceeds maximum length")
+                    continue
+                validation = self.input_validator.validate_text_input(value, max_length)
                 if not validation["valid"]:
                     all_threats.extend([f"{key}: {threat}" for threat in validation["threats"]])
         
@@ -469,7 +1027,7 @@ class SecurityManager:
         else:
             return "api_general"
     
-    async def _is_suspicious_ip(self, ip: str) -> bool:
+    def _is_suspicious_ip(self, ip: str) -> bool:
         """Check if IP address is suspicious"""
         # Check if IP is in blocked list
         if ip in self.blocked_ips:
@@ -480,37 +1038,32 @@ class SecurityManager:
             return False
         
         # Check for private/local IPs (these are generally trusted)
-        try:
-            ip_obj = ipaddress.ip_address(ip)
-            if ip_obj.is_private or ip_obj.is_loopback:
-                return False
-        except ValueError:
+        classification = _classify_ip(ip)
+        if classification is None:
             return True  # Invalid IP format is suspicious
         
+        is_private, is_loopback = classification
+        if is_private or is_loopback:
+            return False
+        
         # Additional IP reputation checks could be added here
         # (e.g., checking against threat intelligence feeds)
         
         return False
     
-    async def _is_suspicious_user_agent(self, user_agent: str) -> bool:
+    def _is_suspicious_user_agent(self, user_agent: str) -> bool:
         """Check if user agent is suspicious"""
         if not user_agent:
             return True
         
-        user_agent_lower = user_agent.lower()
-        
-        # Check for known suspicious patterns
-        for pattern in self.suspicious_user_agents:
-            if pattern in user_agent_lower:
-                return True
-        
-        # Check for empty or very short user agents
-        if len(user_agent.strip()) < 10:
-            return True
-        
-        return False
+        return self._user_agent_verdicts(user_agent)
     
-    async def _log_security_event(
+    def _classify_user_agent(self, user_agent: str) -> bool:
+        """Uncached user agent check, memoized per instance in __init__"""
+        # Known suspicious patterns (one scan for all of them), or empty/very short agents
+        return bool(self._suspicious_user_agent_re.search(user_agent.lower())) or len(user_agent.strip()) < 10
+    
+    def _log_security_event(
         self, 
         event_type: str, 
         threat_level: ThreatLevel, 
@@ -521,7 +1074,6 @@ class SecurityManager:
         metadata: Dict[str, Any] = None
     ):
         """Log security event"""
-        import uuid
         
         event = SecurityEvent(
             event_id=str(uuid.uuid4()),
@@ -531,15 +1083,16 @@ class SecurityManager:
             user_id=user_id,
             user_agent=user_agent,
             description=description,
-            timestamp=datetime.utcnow(),
+            timestamp=time.time(),
             metadata=metadata or {}
         )
         
         self.security_events.append(event)
-        
-        # Keep only recent events (last 1000)
-        if len(self.security_events) > 1000:
-            self.security_events = self.security_events[-1000:]
+        history = self._event_history
+        if len(history) == history.maxlen:
+            self._history_levels[history.popleft()[1]] -= 1
+        history.append((event.timestamp, threat_level))
+        self._history_levels[threat_level] += 1
         
         # Log to system logger
         log_level = logging.WARNING if threat_level in [ThreatLevel.HIGH, ThreatLevel.CRITICAL] else logging.INFO
@@ -547,21 +1100,31 @@ class SecurityManager:
     
     async def get_security_stats(self) -> Dict[str, Any]:
         """Get security statistics"""
-        now = datetime.utcnow()
-        last_hour = now - timedelta(hours=1)
-        last_day = now - timedelta(days=1)
-        
-        recent_events = [e for e in self.security_events if e.timestamp > last_hour]
-        daily_events = [e for e in self.security_events if e.timestamp > last_day]
+        now = time.time()
+        last_hour = now - 3600
+        last_day = now - 86400
+        
+        # History is in time order, so expired entries are all at the front
+        history = self._event_history
+        threat_levels = self._history_levels
+        while history and history[0][0] <= last_day:
+            threat_levels[history.popleft()[1]] -= 1
+        
+        # ...and the last hour is at the back, so only those entries are walked
+        events_last_hour = 0
+        for timestamp, _ in reversed(history):
+            if timestamp <= last_hour:
+                break
+            events_last_hour += 1
         
         return {
             "total_events": len(self.security_events),
-            "events_last_hour": len(recent_events),
-            "events_last_day": len(daily_events),
+            "events_last_hour": events_last_hour,
+            "events_last_day": len(history),
             "blocked_ips_count": len(self.blocked_ips),
             "trusted_ips_count": len(self.trusted_ips),
             "threat_levels": {
-                level.value: len([e for e in daily_events if e.threat_level == level])
+                level.value: threat_levels[level]
                 for level in ThreatLevel
             }
         }
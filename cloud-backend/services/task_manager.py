@@ -4,31 +4,38 @@ Handles task queuing, progress tracking, and result management
 """
 
 import asyncio
+import heapq
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from enum import Enum
+from typing import Dict, List, Optional, Any, Deque, Tuple
+from collections import Counter, defaultdict, deque
+from itertools import islice
+from enum import StrEnum
 import json
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 
-class TaskStatus(Enum):
+class TaskStatus(StrEnum):
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
 
-class TaskType(Enum):
+# Statuses a task does not leave; tasks in them are eventually cleaned up
+TERMINAL_STATUSES = frozenset({TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED})
+
+class TaskType(StrEnum):
     VIDEO_GENERATION = "video_generation"
     AUDIO_GENERATION = "audio_generation"
     IMAGE_GENERATION = "image_generation"
     CODE_GENERATION = "code_generation"
     TEXT_GENERATION = "text_generation"
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     id: str
     type: TaskType
@@ -44,24 +51,50 @@ class Task:
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
     estimated_duration: Optional[int] = None  # seconds
+    # Progress at the last updated_at bump by update_task_progress, and when (monotonic seconds)
+    _flushed_progress: int = field(default=0, repr=False, compare=False)
+    _flushed_at: float = field(default=0.0, repr=False, compare=False)
     
     def to_dict(self) -> Dict[str, Any]:
-        data = asdict(self)
-        # Convert datetime objects to ISO strings
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-            elif isinstance(value, (TaskStatus, TaskType)):
-                data[key] = value.value
-        return data
+        # Built field by field: asdict() would deep-copy parameters/result first
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "user_id": self.user_id,
+            "prompt": self.prompt,
+            "parameters": self.parameters,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "estimated_duration": self.estimated_duration
+        }
+
+class TaskQueueFull(Exception):
+    """Raised when the task queue is at capacity"""
 
 class TaskManager:
-    def __init__(self):
+    def __init__(self, processor=None):
         self.tasks: Dict[str, Task] = {}
-        self.task_queue: asyncio.Queue = asyncio.Queue()
+        self.processor = processor  # Shared AIProcessor, created on first use
+        self.tasks_by_user: Dict[str, Deque[str]] = defaultdict(deque)  # Task IDs, newest first
+        self.expiry_heap: List[Tuple[datetime, str]] = []  # (updated_at, task ID) of finished tasks
+        self.status_counts: Counter = Counter()  # Tasks per status, kept by _set_status
+        self.max_queued_tasks = 1000
+        self.task_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queued_tasks)
         self.active_tasks: Dict[str, asyncio.Task] = {}
         self.max_concurrent_tasks = 5
-        self.processing = False
+        self.workers: List[asyncio.Task] = []  # One per concurrent task slot, see start()
+        
+        # Progress is always stored, but ticks smaller than this step and closer
+        # together than this interval (seconds) don't bump updated_at or log;
+        # status changes always do
+        self.progress_flush_step = 5
+        self.progress_flush_interval = 0.5
         
         # Task estimation times (seconds)
         self.task_estimations = {
@@ -95,14 +128,20 @@ class TaskManager:
             estimated_duration=self.task_estimations.get(task_type, 60)
         )
         
+        # Fail fast rather than letting the backlog grow without bound
+        try:
+            self.task_queue.put_nowait(task_id)
+        except asyncio.QueueFull:
+            raise TaskQueueFull("Task queue is full, try again later")
+        
         self.tasks[task_id] = task
-        await self.task_queue.put(task_id)
+        self.tasks_by_user[user_id].appendleft(task_id)
+        self.status_counts[TaskStatus.PENDING] += 1
         
-        logger.info(f"Created task {task_id} of type {task_type.value} for user {user_id}")
+        logger.info(f"Created task {task_id} of type {task_type} for user {user_id}")
         
-        # Start processing if not already running
-        if not self.processing:
-            asyncio.create_task(self.process_queue())
+        # Normally already running from app startup
+        await self.start()
         
         return task_id
     
@@ -112,13 +151,10 @@ class TaskManager:
     
     async def get_user_tasks(self, user_id: str, limit: int = 50) -> List[Task]:
         """Get all tasks for a user"""
-        user_tasks = [
-            task for task in self.tasks.values() 
-            if task.user_id == user_id
-        ]
-        # Sort by creation time, newest first
-        user_tasks.sort(key=lambda x: x.created_at, reverse=True)
-        return user_tasks[:limit]
+        # The per-user index is already ordered by creation time, newest first
+        task_ids = self.tasks_by_user.get(user_id, ())
+        # islice rejects negative counts; limit comes straight from the query string
+        return [self.tasks[task_id] for task_id in islice(task_ids, max(limit, 0))]
     
     async def update_task_progress(self, task_id: str, progress: int, status: TaskStatus = None):
         """Update task progress and status"""
@@ -126,17 +162,27 @@ class TaskManager:
             return
         
         task = self.tasks[task_id]
-        task.progress = max(0, min(100, progress))
-        task.updated_at = datetime.utcnow()
+        task.progress = progress = max(0, min(100, progress))
+        monotonic_now = time.monotonic()
+        if (status is None and
+            abs(progress - task._flushed_progress) < self.progress_flush_step and
+            monotonic_now - task._flushed_at < self.progress_flush_interval):
+            return
+        
+        now = datetime.utcnow()
+        task._flushed_progress = progress
+        task._flushed_at = monotonic_now
+        task.updated_at = now
         
         if status:
-            task.status = status
+            self._set_status(task, status)
             if status == TaskStatus.PROCESSING and not task.started_at:
-                task.started_at = datetime.utcnow()
-            elif status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
-                task.completed_at = datetime.utcnow()
+                task.started_at = now
+            elif status in TERMINAL_STATUSES:
+                task.completed_at = now
+                self._schedule_cleanup(task)
         
-        logger.debug(f"Task {task_id} progress: {progress}%, status: {task.status.value}")
+        logger.debug(f"Task {task_id} progress: {progress}%, status: {task.status}")
     
     async def complete_task(self, task_id: str, result: Dict[str, Any]):
         """Mark task as completed with result"""
@@ -144,11 +190,11 @@ class TaskManager:
             return
         
         task = self.tasks[task_id]
-        task.status = TaskStatus.COMPLETED
+        self._set_status(task, TaskStatus.COMPLETED)
         task.progress = 100
         task.result = result
-        task.completed_at = datetime.utcnow()
-        task.updated_at = datetime.utcnow()
+        task.completed_at = task.updated_at = datetime.utcnow()
+        self._schedule_cleanup(task)
         
         # Remove from active tasks
         if task_id in self.active_tasks:
@@ -162,10 +208,10 @@ class TaskManager:
             return
         
         task = self.tasks[task_id]
-        task.status = TaskStatus.FAILED
+        self._set_status(task, TaskStatus.FAILED)
         task.error = error
-        task.completed_at = datetime.utcnow()
-        task.updated_at = datetime.utcnow()
+        task.completed_at = task.updated_at = datetime.utcnow()
+        self._schedule_cleanup(task)
         
         # Remove from active tasks
         if task_id in self.active_tasks:
@@ -182,52 +228,67 @@ class TaskManager:
         
         # If task is still pending, just mark as cancelled
         if task.status == TaskStatus.PENDING:
-            task.status = TaskStatus.CANCELLED
-            task.completed_at = datetime.utcnow()
-            task.updated_at = datetime.utcnow()
+            self._set_status(task, TaskStatus.CANCELLED)
+            task.completed_at = task.updated_at = datetime.utcnow()
+            self._schedule_cleanup(task)
             return True
         
         # If task is processing, cancel the asyncio task
         if task_id in self.active_tasks:
             self.active_tasks[task_id].cancel()
-            task.status = TaskStatus.CANCELLED
-            task.completed_at = datetime.utcnow()
-            task.updated_at = datetime.utcnow()
+            self._set_status(task, TaskStatus.CANCELLED)
+            task.completed_at = task.updated_at = datetime.utcnow()
+            self._schedule_cleanup(task)
             del self.active_tasks[task_id]
             return True
         
         return False
     
-    async def process_queue(self):
-        """Process tasks from the queue"""
-        self.processing = True
-        
-        try:
-            while True:
-                # Check if we have capacity for more tasks
-                if len(self.active_tasks) >= self.max_concurrent_tasks:
-                    await asyncio.sleep(1)
-                    continue
-                
-                try:
-                    # Wait for a task with timeout to prevent blocking forever
-                    task_id = await asyncio.wait_for(self.task_queue.get(), timeout=5.0)
-                    
-                    if task_id in self.tasks:
-                        # Start processing the task
-                        process_task = asyncio.create_task(self._process_single_task(task_id))
-                        self.active_tasks[task_id] = process_task
-                    
-                except asyncio.TimeoutError:
-                    # Check if there are any active tasks, if not, stop processing
-                    if not self.active_tasks:
-                        break
+    def _set_status(self, task: Task, status: TaskStatus):
+        """Change a task's status, keeping status_counts in step"""
+        self.status_counts[task.status] -= 1
+        self.status_counts[status] += 1
+        task.status = status
+    
+    def _schedule_cleanup(self, task: Task):
+        """Queue a finished task for cleanup_old_tasks"""
+        heapq.heappush(self.expiry_heap, (task.updated_at, task.id))
+    
+    async def start(self):
+        """Start the worker pool (idempotent)"""
+        if not self.workers:
+            self.workers = [
+                asyncio.create_task(self._worker())
+                for _ in range(self.max_concurrent_tasks)
+            ]
+            logger.info(f"Started {len(self.workers)} task workers")
+    
+    async def stop(self):
+        """Stop the worker pool and cancel tasks still running"""
+        workers, self.workers = self.workers, []
+        for running in [*workers, *self.active_tasks.values()]:
+            running.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def _worker(self):
+        """Process tasks from the queue, one at a time"""
+        while True:
+            task_id = await self.task_queue.get()
+            try:
+                task = self.tasks.get(task_id)
+                # Skip tasks removed or cancelled while still queued
+                if not task or task.status != TaskStatus.PENDING:
                     continue
                 
-        except Exception as e:
-            logger.error(f"Error in task processing queue: {e}")
-        finally:
-            self.processing = False
+                # Run in its own asyncio task so cancel_task can cancel it
+                # without taking the worker down
+                process_task = asyncio.create_task(self._process_single_task(task_id))
+                self.active_tasks[task_id] = process_task
+                await asyncio.wait([process_task])
+            except Exception as e:
+                logger.error(f"Error in task worker: {e}")
+            finally:
+                self.task_queue.task_done()
     
     async def _process_single_task(self, task_id: str):
         """Process a single task"""
@@ -238,11 +299,7 @@ class TaskManager:
         try:
             await self.update_task_progress(task_id, 0, TaskStatus.PROCESSING)
             
-            # Import here to avoid circular imports
-            from .ai_processor import AIProcessor
-            
-            processor = AIProcessor()
-            result = await processor.process_task(task)
+            result = await self._get_processor().process_task(task)
             
             await self.complete_task(task_id, result)
             
@@ -256,12 +313,20 @@ class TaskManager:
             if task_id in self.active_tasks:
                 del self.active_tasks[task_id]
     
+    def _get_processor(self):
+        """Return the shared AIProcessor, creating it on first use"""
+        if self.processor is None:
+            # Imported here because ai_processor imports this module
+            from .ai_processor import AIProcessor
+            self.processor = AIProcessor()
+        return self.processor
+    
     async def get_queue_status(self) -> Dict[str, Any]:
         """Get current queue status"""
-        pending_count = sum(1 for task in self.tasks.values() if task.status == TaskStatus.PENDING)
+        pending_count = self.status_counts[TaskStatus.PENDING]
         processing_count = len(self.active_tasks)
-        completed_count = sum(1 for task in self.tasks.values() if task.status == TaskStatus.COMPLETED)
-        failed_count = sum(1 for task in self.tasks.values() if task.status == TaskStatus.FAILED)
+        completed_count = self.status_counts[TaskStatus.COMPLETED]
+        failed_count = self.status_counts[TaskStatus.FAILED]
         
         return {
             "queue_size": self.task_queue.qsize(),
@@ -272,21 +337,39 @@ class TaskManager:
             "processing": processing_count,
             "completed": completed_count,
             "failed": failed_count,
-            "is_processing": self.processing
+            "is_processing": bool(self.workers)
         }
     
     async def cleanup_old_tasks(self, days: int = 7):
         """Clean up old completed/failed tasks"""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
+        # Only finished tasks are in the heap, oldest first, so just the
+        # expired ones are visited
+        heap = self.expiry_heap
         tasks_to_remove = []
-        for task_id, task in self.tasks.items():
-            if (task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED] and
-                task.updated_at < cutoff_date):
+        affected_users = set()
+        while heap and heap[0][0] < cutoff_date:
+            _, task_id = heapq.heappop(heap)
+            task = self.tasks.get(task_id)
+            if not task or task.status not in TERMINAL_STATUSES:
+                continue
+            if task.updated_at < cutoff_date:
+                del self.tasks[task_id]
+                self.status_counts[task.status] -= 1
                 tasks_to_remove.append(task_id)
+                affected_users.add(task.user_id)
+            else:
+                # Touched since it finished; check again once that expires
+                heapq.heappush(heap, (task.updated_at, task_id))
         
-        for task_id in tasks_to_remove:
-            del self.tasks[task_id]
+        # Drop removed tasks from the per-user index
+        for user_id in affected_users:
+            remaining = deque(task_id for task_id in self.tasks_by_user[user_id] if task_id in self.tasks)
+            if remaining:
+                self.tasks_by_user[user_id] = remaining
+            else:
+                del self.tasks_by_user[user_id]
         
         logger.info(f"Cleaned up {len(tasks_to_remove)} old tasks")
         return len(tasks_to_remove)
@@ -4,29 +4,48 @@ Handles user authentication, authorization, and user data management
 """
 
 import asyncio
+import base64
 import hashlib
+import hmac
+import os
 import secrets
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
-from enum import Enum
+from typing import Dict, List, Optional, Any, Set
+from collections import defaultdict
+from dataclasses import dataclass
+from enum import StrEnum
 import json
-import jwt
+import msgpack
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
 
 logger = logging.getLogger(__name__)
 
-class UserRole(Enum):
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+# Every token is HS256, so the encoded JOSE header is a constant
+_JWT_HEADER = _b64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+
+class UserRole(StrEnum):
     USER = "user"
     PREMIUM = "premium"
     ADMIN = "admin"
 
-class UserStatus(Enum):
+class UserStatus(StrEnum):
     ACTIVE = "active"
     SUSPENDED = "suspended"
     DELETED = "deleted"
 
-@dataclass
+@dataclass(slots=True)
 class User:
     user_id: str
     username: str
@@ -42,22 +61,28 @@ class User:
     metadata: Dict[str, Any] = None
     
     def to_dict(self, include_sensitive: bool = False) -> Dict[str, Any]:
-        data = asdict(self)
-        # Convert datetime objects to ISO strings
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat() if value else None
-            elif isinstance(value, (UserRole, UserStatus)):
-                data[key] = value.value
-        
-        # Remove sensitive information unless explicitly requested
-        if not include_sensitive:
-            data.pop('password_hash', None)
-            data.pop('api_key', None)
+        # Built field by field: asdict() would deep-copy the quota and metadata dicts first
+        data = {
+            "user_id": self.user_id,
+            "username": self.username,
+            "email": self.email,
+            "role": self.role,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "last_login": self.last_login.isoformat() if self.last_login else None,
+            "quota_limits": self.quota_limits,
+            "quota_used": self.quota_used,
+            "metadata": self.metadata
+        }
+        
+        # Sensitive information only when explicitly requested
+        if include_sensitive:
+            data["password_hash"] = self.password_hash
+            data["api_key"] = self.api_key
         
         return data
 
-@dataclass
+@dataclass(slots=True)
 class UserSession:
     session_id: str
     user_id: str
@@ -66,14 +91,53 @@ class UserSession:
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
     is_active: bool = True
+    
+    def to_msgpack(self) -> bytes:
+        return msgpack.packb({
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "created_at": self.created_at.isoformat(),
+            "expires_at": self.expires_at.isoformat(),
+            "ip_address": self.ip_address,
+            "user_agent": self.user_agent,
+            "is_active": self.is_active
+        }, use_bin_type=True)
+    
+    @classmethod
+    def from_msgpack(cls, raw: bytes) -> "UserSession":
+        data = msgpack.unpackb(raw, raw=False)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        data["expires_at"] = datetime.fromisoformat(data["expires_at"])
+        return cls(**data)
 
 class UserManager:
-    def __init__(self, jwt_secret: str = None):
+    """Users are held in process; sessions go to Redis when a client is given
+    
+    Redis sessions are shared by every worker and expire on their own
+    (msgpack under session:<id> with a TTL, plus a user_sessions:<user_id>
+    set for stats).
+    Without Redis, or if a Redis call fails, self.sessions is used instead.
+    """
+    
+    def __init__(self, jwt_secret: str = None, redis_client=None):
         self.users: Dict[str, User] = {}
         self.sessions: Dict[str, UserSession] = {}
+        self._sessions_by_user: Dict[str, Set[str]] = defaultdict(set)  # IDs of in-process sessions
+        self.redis = redis_client
+        
+        # Lookup indexes into self.users (emails and usernames are lowercased)
+        self._users_by_email: Dict[str, str] = {}
+        self._users_by_username: Dict[str, str] = {}
+        self._users_by_api_key: Dict[str, str] = {}
         self.jwt_secret = jwt_secret or secrets.token_urlsafe(32)
+        # Keyed HMAC state, copied per token instead of re-deriving it from the secret
+        self._jwt_mac = hmac.new(self.jwt_secret.encode(), digestmod=hashlib.sha256)
         self.session_duration_hours = 24
         
+        # Counters zeroed by the periodic quota resets
+        self.daily_quota_reset = {"daily_tasks": 0}
+        self.monthly_quota_reset = {"monthly_storage_mb": 0}
+        
         # Default quota limits for different user roles
         self.default_quotas = {
             UserRole.USER: {
@@ -107,6 +171,12 @@ class UserManager:
                 "text_generation": -1
             }
         }
+        
+        # Zeroed usage counters per role, copied for each new user
+        self.default_quota_used = {
+            role: dict.fromkeys(quotas, 0)
+            for role, quotas in self.default_quotas.items()
+        }
     
     async def create_user(
         self, 
@@ -116,6 +186,10 @@ class UserManager:
         role: UserRole = UserRole.USER
     ) -> User:
         """Create a new user"""
+        # Hash password (off the event loop, see _hash_password). This is the only
+        # await, so it comes before the existence checks to keep check-and-insert atomic
+        password_hash = await asyncio.to_thread(self._hash_password, password)
+        
         # Check if user already exists
         if await self.get_user_by_email(email):
             raise ValueError(f"User with email {email} already exists")
@@ -124,17 +198,14 @@ class UserManager:
             raise ValueError(f"User with username {username} already exists")
         
         # Generate user ID
-        user_id = self._generate_user_id(username, email)
-        
-        # Hash password
-        password_hash = self._hash_password(password)
+        user_id = self._generate_user_id()
         
         # Generate API key
         api_key = self._generate_api_key()
         
         # Set default quotas
         quota_limits = self.default_quotas[role].copy()
-        quota_used = {key: 0 for key in quota_limits.keys()}
+        quota_used = self.default_quota_used[role].copy()
         
         user = User(
             user_id=user_id,
@@ -151,8 +222,11 @@ class UserManager:
         )
         
         self.users[user_id] = user
+        self._users_by_email[email.lower()] = user_id
+        self._users_by_username[username.lower()] = user_id
+        self._users_by_api_key[api_key] = user_id
         
-        logger.info(f"Created user {username} ({user_id}) with role {role.value}")
+        logger.info(f"Created user {username} ({user_id}) with role {role}")
         return user
     
     async def authenticate_user(self, email: str, password: str) -> Optional[User]:
@@ -164,7 +238,7 @@ class UserManager:
         if user.status != UserStatus.ACTIVE:
             raise ValueError("User account is not active")
         
-        if not self._verify_password(password, user.password_hash):
+        if not await asyncio.to_thread(self._verify_password, password, user.password_hash):
             return None
         
         # Update last login
@@ -175,9 +249,9 @@ class UserManager:
     
     async def authenticate_api_key(self, api_key: str) -> Optional[User]:
         """Authenticate user with API key"""
-        for user in self.users.values():
-            if user.api_key == api_key and user.status == UserStatus.ACTIVE:
-                return user
+        user = self.users.get(self._users_by_api_key.get(api_key))
+        if user and user.status == UserStatus.ACTIVE:
+            return user
         return None
     
     async def create_session(self, user_id: str, ip_address: str = None, user_agent: str = None) -> UserSession:
@@ -187,26 +261,56 @@ class UserManager:
             raise ValueError("User not found")
         
         session_id = secrets.token_urlsafe(32)
-        expires_at = datetime.utcnow() + timedelta(hours=self.session_duration_hours)
+        now = datetime.utcnow()
+        expires_at = now + timedelta(hours=self.session_duration_hours)
         
         session = UserSession(
             session_id=session_id,
             user_id=user_id,
-            created_at=datetime.utcnow(),
+            created_at=now,
             expires_at=expires_at,
             ip_address=ip_address,
             user_agent=user_agent,
             is_active=True
         )
         
-        self.sessions[session_id] = session
+        if not await self._store_session(session):
+            self.sessions[session_id] = session
+            self._sessions_by_user[user_id].add(session_id)
         
         logger.info(f"Created session {session_id} for user {user_id}")
         return session
     
+    async def _store_session(self, session: UserSession) -> bool:
+        """Write a session to Redis with a TTL; False if it must be kept locally"""
+        if self.redis is None:
+            return False
+        
+        ttl = self.session_duration_hours * 3600
+        user_key = f"user_sessions:{session.user_id}"
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(f"session:{session.session_id}", session.to_msgpack(), ex=ttl)
+                pipe.sadd(user_key, session.session_id)
+                pipe.expire(user_key, ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis session store failed, keeping session in process: {e}")
+            return False
+    
     async def get_session(self, session_id: str) -> Optional[UserSession]:
         """Get session by ID"""
         session = self.sessions.get(session_id)
+        if not session and self.redis is not None:
+            try:
+                raw = await self.redis.get(f"session:{session_id}")
+            except Exception as e:
+                logger.warning(f"Redis session lookup failed: {e}")
+                raw = None
+            # Redis drops expired sessions itself
+            return UserSession.from_msgpack(raw) if raw else None
+        
         if not session:
             return None
         
@@ -220,9 +324,23 @@ class UserManager:
     async def invalidate_session(self, session_id: str) -> bool:
         """Invalidate a session"""
         if session_id in self.sessions:
-            del self.sessions[session_id]
+            user_id = self.sessions.pop(session_id).user_id
+            user_sessions = self._sessions_by_user[user_id]
+            user_sessions.discard(session_id)
+            if not user_sessions:
+                del self._sessions_by_user[user_id]
             logger.info(f"Invalidated session {session_id}")
             return True
+        
+        if self.redis is not None:
+            try:
+                raw = await self.redis.getdel(f"session:{session_id}")
+                if raw:
+                    await self.redis.srem(f"user_sessions:{UserSession.from_msgpack(raw).user_id}", session_id)
+                    logger.info(f"Invalidated session {session_id}")
+                    return True
+            except Exception as e:
+                logger.warning(f"Redis session invalidation failed: {e}")
         return False
     
     async def get_user(self, user_id: str) -> Optional[User]:
@@ -231,17 +349,11 @@ class UserManager:
     
     async def get_user_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
-        for user in self.users.values():
-            if user.email.lower() == email.lower():
-                return user
-        return None
+        return self.users.get(self._users_by_email.get(email.lower()))
     
     async def get_user_by_username(self, username: str) -> Optional[User]:
         """Get user by username"""
-        for user in self.users.values():
-            if user.username.lower() == username.lower():
-                return user
-        return None
+        return self.users.get(self._users_by_username.get(username.lower()))
     
     async def update_user(self, user_id: str, updates: Dict[str, Any]) -> bool:
         """Update user information"""
@@ -251,15 +363,28 @@ class UserManager:
         
         # Update allowed fields
         allowed_fields = ['username', 'email', 'role', 'status', 'quota_limits', 'metadata']
+        indexes = {'email': self._users_by_email, 'username': self._users_by_username}
         
+        # Validate everything first, so a rejected update leaves the user and indexes untouched
+        changes = {}
         for field, value in updates.items():
             if field in allowed_fields:
                 if field == 'role' and isinstance(value, str):
                     value = UserRole(value)
                 elif field == 'status' and isinstance(value, str):
                     value = UserStatus(value)
+                elif field in indexes:
+                    if not isinstance(value, str):
+                        raise ValueError(f"{field} must be a string")
+                    if indexes[field].get(value.lower(), user_id) != user_id:
+                        raise ValueError(f"User with {field} {value} already exists")
                 
-                setattr(user, field, value)
+                changes[field] = value
+        
+        for field, value in changes.items():
+            if field in indexes:
+                self._reindex(indexes[field], getattr(user, field).lower(), value.lower(), user_id)
+            setattr(user, field, value)
         
         logger.info(f"Updated user {user_id}")
         return True
@@ -270,10 +395,10 @@ class UserManager:
         if not user:
             return False
         
-        if not self._verify_password(old_password, user.password_hash):
+        if not await asyncio.to_thread(self._verify_password, old_password, user.password_hash):
             return False
         
-        user.password_hash = self._hash_password(new_password)
+        user.password_hash = await asyncio.to_thread(self._hash_password, new_password)
         logger.info(f"Password changed for user {user_id}")
         return True
     
@@ -284,6 +409,7 @@ class UserManager:
             raise ValueError("User not found")
         
         new_api_key = self._generate_api_key()
+        self._reindex(self._users_by_api_key, user.api_key, new_api_key, user_id)
         user.api_key = new_api_key
         
         logger.info(f"API key reset for user {user_id}")
@@ -320,23 +446,15 @@ class UserManager:
     
     async def reset_daily_quotas(self):
         """Reset daily quotas for all users (should be called daily)"""
-        daily_quotas = ['daily_tasks']
-        
         for user in self.users.values():
-            for quota_type in daily_quotas:
-                if quota_type in user.quota_used:
-                    user.quota_used[quota_type] = 0
+            user.quota_used.update(self.daily_quota_reset)
         
         logger.info("Reset daily quotas for all users")
     
     async def reset_monthly_quotas(self):
         """Reset monthly quotas for all users (should be called monthly)"""
-        monthly_quotas = ['monthly_storage_mb']
-        
         for user in self.users.values():
-            for quota_type in monthly_quotas:
-                if quota_type in user.quota_used:
-                    user.quota_used[quota_type] = 0
+            user.quota_used.update(self.monthly_quota_reset)
         
         logger.info("Reset monthly quotas for all users")
     
@@ -347,15 +465,16 @@ class UserManager:
             return {}
         
         # Count user's active sessions
-        active_sessions = sum(1 for session in self.sessions.values() 
-                            if session.user_id == user_id and 
-                               session.is_active and 
-                               datetime.utcnow() <= session.expires_at)
+        now = datetime.utcnow()
+        active_sessions = sum(1 for session_id in self._sessions_by_user.get(user_id, ())
+                            if self.sessions[session_id].is_active and
+                               now <= self.sessions[session_id].expires_at)
+        active_sessions += await self._count_redis_sessions(user_id)
         
         return {
             "user_id": user_id,
-            "role": user.role.value,
-            "status": user.status.value,
+            "role": user.role,
+            "status": user.status,
             "created_at": user.created_at.isoformat(),
             "last_login": user.last_login.isoformat() if user.last_login else None,
             "quota_limits": user.quota_limits,
@@ -363,33 +482,85 @@ class UserManager:
             "active_sessions": active_sessions
         }
     
+    async def _count_redis_sessions(self, user_id: str) -> int:
+        """Count a user's live sessions in Redis, pruning expired ones from the set"""
+        if self.redis is None:
+            return 0
+        
+        user_key = f"user_sessions:{user_id}"
+        try:
+            session_ids = [
+                sid.decode() if isinstance(sid, bytes) else sid
+                for sid in await self.redis.smembers(user_key)
+            ]
+            if not session_ids:
+                return 0
+            
+            live = await self.redis.mget([f"session:{sid}" for sid in session_ids])
+            expired = [sid for sid, raw in zip(session_ids, live) if raw is None]
+            if expired:
+                await self.redis.srem(user_key, *expired)
+            return len(session_ids) - len(expired)
+        except Exception as e:
+            logger.warning(f"Redis session count failed: {e}")
+            return 0
+    
     def generate_jwt_token(self, user_id: str) -> str:
         """Generate JWT token for user"""
+        now = int(time.time())
         payload = {
             'user_id': user_id,
-            'exp': datetime.utcnow() + timedelta(hours=24),
-            'iat': datetime.utcnow()
+            'exp': now + 24 * 3600,
+            'iat': now
         }
-        return jwt.encode(payload, self.jwt_secret, algorithm='HS256')
+        signing_input = _JWT_HEADER + b'.' + _b64url_encode(json.dumps(payload, separators=(',', ':')).encode())
+        return (signing_input + b'.' + _b64url_encode(self._sign_jwt(signing_input))).decode()
     
     def verify_jwt_token(self, token: str) -> Optional[str]:
         """Verify JWT token and return user ID"""
         try:
-            payload = jwt.decode(token, self.jwt_secret, algorithms=['HS256'])
-            return payload.get('user_id')
-        except jwt.ExpiredSignatureError:
-            return None
-        except jwt.InvalidTokenError:
+            header, payload, signature = token.encode().split(b'.')
+            if not hmac.compare_digest(self._sign_jwt(header + b'.' + payload), _b64url_decode(signature)):
+                return None
+            if json.loads(_b64url_decode(header)).get('alg') != 'HS256':
+                return None
+            
+            claims = json.loads(_b64url_decode(payload))
+            if 'exp' in claims:
+                # A present exp must be a real number (null or a bool doesn't count) and in the future
+                exp = claims['exp']
+                if isinstance(exp, bool) or not isinstance(exp, (int, float)) or exp <= time.time():
+                    return None
+            return claims.get('user_id')
+        except Exception:
+            # Malformed token: wrong segment count, bad base64 or JSON
             return None
     
-    def _generate_user_id(self, username: str, email: str) -> str:
-        """Generate unique user ID"""
-        import uuid
-        data = f"{username}_{email}_{datetime.utcnow().isoformat()}_{uuid.uuid4()}"
-        return hashlib.md5(data.encode()).hexdigest()[:12]
+    def _sign_jwt(self, signing_input: bytes) -> bytes:
+        """HS256 signature of a token's header.payload"""
+        mac = self._jwt_mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+    
+    def _generate_user_id(self) -> str:
+        """Generate unique user ID (12 random hex characters)"""
+        user_id = secrets.token_hex(6)
+        while user_id in self.users:
+            user_id = secrets.token_hex(6)
+        return user_id
+    
+    def _reindex(self, index: Dict[str, str], old_key: Optional[str], new_key: str, user_id: str):
+        """Move a user's entry in a lookup index from old_key to new_key (callers check new_key is free)"""
+        if index.get(old_key) == user_id:
+            del index[old_key]
+        index[new_key] = user_id
     
     def _hash_password(self, password: str) -> str:
-        """Hash password with salt"""
+        """Hash password with salt
+        
+        100k PBKDF2 rounds take tens of milliseconds; async callers run this
+        and _verify_password via asyncio.to_thread (hashlib releases the GIL).
+        """
         salt = secrets.token_hex(16)
         pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
         return f"{salt}:{pwd_hash.hex()}"
@@ -399,7 +570,8 @@ class UserManager:
         try:
             salt, stored_hash = password_hash.split(':')
             pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
-            return pwd_hash.hex() == stored_hash
+            # Constant-time compare of the raw digests
+            return hmac.compare_digest(pwd_hash, bytes.fromhex(stored_hash))
         except Exception:
             return False
     
@@ -407,5 +579,12 @@ class UserManager:
         """Generate API key"""
         return f"aistudio_{secrets.token_urlsafe(32)}"
 
+def _create_redis_client():
+    """Connect to Redis when REDIS_URL is configured and the client is installed"""
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url and aioredis is not None:
+        return aioredis.from_url(redis_url)
+    return None
+
 # Global user manager instance
-user_manager = UserManager()
\ No newline at end of file
+user_manager = UserManager(redis_client=_create_redis_client())
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Security manager tests - IP range sets, and the in-process and Redis (Lua)
+sliding-window rate limiters, which must agree on every decision
+"""
+
+import asyncio
+import ipaddress
+import random
+import time
+
+import pytest
+
+from services import security_manager
+from services.security_manager import (
+    IPRangeSet, RateLimiter, RateLimitRule, RedisRateLimiter, SecurityAction, SecurityManager
+)
+
+
+def ranges(ip_set: IPRangeSet):
+    return (
+        list(zip(ip_set._v4_starts.tolist(), ip_set._v4_ends.tolist())),
+        list(zip(ip_set._v6_starts, ip_set._v6_ends)),
+    )
+
+
+def test_add_single_addresses():
+    blocked = IPRangeSet()
+    blocked.add("10.0.0.5")
+    blocked.add("2001:db8::1")
+
+    assert "10.0.0.5" in blocked
+    assert "10.0.0.6" not in blocked
+    assert "2001:db8::1" in blocked
+    assert "2001:db8::2" not in blocked
+    assert len(blocked) == 2
+
+
+def test_add_is_idempotent_and_skips_covered_addresses():
+    blocked = IPRangeSet(["10.0.0.0/24"])
+    before = ranges(blocked)
+
+    blocked.add("10.0.0.7")
+    blocked.add("10.0.0.0/24")
+    blocked.add("10.0.0.0/28")
+
+    assert ranges(blocked) == before
+
+
+def test_add_merges_every_overlapped_range():
+    blocked = IPRangeSet(["10.0.0.1", "10.0.0.9", "10.0.1.0/24", "192.168.0.1"])
+    blocked.add("10.0.0.0/16")
+
+    v4, _ = ranges(blocked)
+    network = ipaddress.ip_network("10.0.0.0/16")
+    assert v4 == [
+        (int(network.network_address), int(network.broadcast_address)),
+        (int(ipaddress.ip_address("192.168.0.1")),) * 2,
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_add_matches_update(seed):
+    rnd = random.Random(seed)
+
+    def random_network():
+        if rnd.random() < 0.7:
+            address = ipaddress.IPv4Address(0x0A000000 + rnd.randrange(1 << 16))
+            return f"{address}/{rnd.choice([32, 30, 28, 24, 20])}"
+        address = ipaddress.IPv6Address((0x20010DB8 << 96) + rnd.randrange(1 << 20))
+        return f"{address}/{rnd.choice([128, 124, 116, 108])}"
+
+    networks = [random_network() for _ in range(50)]
+    one_by_one = IPRangeSet()
+    for network in networks:
+        one_by_one.add(network)
+
+    assert ranges(one_by_one) == ranges(IPRangeSet(networks))
+
+
+class Clock:
+    """Settable stand-in for time.time, shared by both limiters (the Lua script gets now as an argument)"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(security_manager.time, "time", fake)
+    return fake
+
+
+def redis_limiter(rules=None):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis needs it to run Lua scripts
+    limiter = RedisRateLimiter(fakeredis.FakeAsyncRedis())
+    if rules:
+        limiter.rules = rules
+    return limiter
+
+
+def in_process_limiter(rules=None):
+    limiter = RateLimiter()
+    if rules:
+        limiter.rules = rules
+    return limiter
+
+
+async def decisions(limiter, requests, rule="test"):
+    """Run (ip, user_id) requests through a limiter and collect its decisions"""
+    return [await limiter.check_rate_limit_async(rule, ip, user) for ip, user in requests]
+
+
+LIMIT_ONLY = {"test": RateLimitRule("test", 3, 60)}
+BURST = {"test": RateLimitRule("test", 10, 300, burst_limit=2, block_duration_seconds=900)}
+
+ALLOW, LIMIT, BLOCK = SecurityAction.ALLOW, SecurityAction.RATE_LIMIT, SecurityAction.BLOCK_TEMPORARY
+
+
+@pytest.mark.parametrize("make_limiter", [in_process_limiter, redis_limiter])
+def test_rate_limits_after_window_is_full(clock, make_limiter):
+    limiter = make_limiter(LIMIT_ONLY)
+    requests = [("1.1.1.1", None)] * 5 + [("2.2.2.2", None)]
+    assert asyncio.run(decisions(limiter, requests)) == [ALLOW, ALLOW, ALLOW, LIMIT, LIMIT, ALLOW]
+
+
+@pytest.mark.parametrize("make_limiter", [in_process_limiter, redis_limiter])
+def test_window_slides(clock, make_limiter):
+    limiter = make_limiter(LIMIT_ONLY)
+    ip = [("1.1.1.1", None)]
+
+    async def run():
+        assert await decisions(limiter, ip * 4) == [ALLOW, ALLOW, ALLOW, LIMIT]
+        clock.now += 61
+        assert await decisions(limiter, ip) == [ALLOW]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("make_limiter", [in_process_limiter, redis_limiter])
+def test_burst_blocks_ip_and_user(clock, make_limiter):
+    limiter = make_limiter(BURST)
+
+    async def run():
+        assert await decisions(limiter, [("1.1.1.1", "u1")] * 3) == [ALLOW, ALLOW, BLOCK]
+
+        # Both the IP and the user stay blocked, from anywhere, until the block expires
+        later = [("1.1.1.1", None), ("9.9.9.9", "u1"), ("9.9.9.9", None)]
+        assert await decisions(limiter, later) == [BLOCK, BLOCK, ALLOW]
+
+        clock.now += 901
+        assert await decisions(limiter, [("1.1.1.1", "u1")]) == [ALLOW]
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("make_limiter", [in_process_limiter, redis_limiter])
+def test_user_is_counted_across_ips(clock, make_limiter):
+    limiter = make_limiter(LIMIT_ONLY)
+    requests = [("1.1.1.1", "u1"), ("2.2.2.2", "u1"), ("3.3.3.3", "u1"), ("4.4.4.4", "u1")]
+    assert asyncio.run(decisions(limiter, requests)) == [ALLOW, ALLOW, ALLOW, LIMIT]
+
+
+def test_redis_state_is_shared_between_limiters(clock):
+    first = redis_limiter(LIMIT_ONLY)
+    second = RedisRateLimiter(first.redis)
+    second.rules = LIMIT_ONLY
+
+    async def run():
+        assert await decisions(first, [("1.1.1.1", None)] * 2) == [ALLOW, ALLOW]
+        assert await decisions(second, [("1.1.1.1", None)] * 2) == [ALLOW, LIMIT]
+
+    asyncio.run(run())
+
+
+def test_unknown_rule_is_allowed(clock):
+    limiter = redis_limiter(LIMIT_ONLY)
+    assert asyncio.run(decisions(limiter, [("1.1.1.1", None)] * 5, rule="missing")) == [ALLOW] * 5
+
+
+def test_redis_failure_falls_back_to_in_process_limits(clock):
+    class BrokenRedis:
+        def register_script(self, script):
+            async def run(keys, args):
+                raise ConnectionError("redis is down")
+            return run
+
+    limiter = RedisRateLimiter(BrokenRedis())
+    limiter.rules = LIMIT_ONLY
+    assert asyncio.run(decisions(limiter, [("1.1.1.1", None)] * 4)) == [ALLOW, ALLOW, ALLOW, LIMIT]
+
+
+@pytest.mark.parametrize("host", ["10.0.0.9", "testclient", "unknown", ""])
+def test_failed_logins_lock_account_for_any_client_host(host):
+    async def run():
+        manager = SecurityManager()
+        results = [await manager.record_failed_login("bob", host) for _ in range(manager.max_failed_attempts)]
+        return manager, results
+
+    manager, results = asyncio.run(run())
+    assert results == [False] * (manager.max_failed_attempts - 1) + [True]
+    # Only real addresses can be blocked; other hosts just lock the account
+    assert (host in manager.blocked_ips) == (host == "10.0.0.9")
+    assert len(manager.blocked_ips) == (1 if host == "10.0.0.9" else 0)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
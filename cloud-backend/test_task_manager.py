@@ -0,0 +1,150 @@
+"""
+TaskManager tests - worker pool limits, queue back-pressure and progress coalescing
+"""
+
+import asyncio
+
+import pytest
+
+from services.task_manager import TaskManager, TaskQueueFull, TaskStatus, TaskType
+
+
+class BlockingProcessor:
+    """Stands in for AIProcessor; every task runs until release() is called"""
+
+    def __init__(self):
+        self.started = 0
+        self.running = 0
+        self.max_running = 0
+        self.gate = asyncio.Event()
+
+    async def process_task(self, task):
+        self.started += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.gate.wait()
+            return {"echo": task.prompt}
+        finally:
+            self.running -= 1
+
+    def release(self):
+        self.gate.set()
+
+
+def make_manager(max_queued: int, max_concurrent: int) -> TaskManager:
+    manager = TaskManager(processor=BlockingProcessor())
+    manager.max_queued_tasks = max_queued
+    manager.task_queue = asyncio.Queue(maxsize=max_queued)
+    manager.max_concurrent_tasks = max_concurrent
+    return manager
+
+
+async def settle():
+    """Let the workers pick up whatever they can"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_raises_task_queue_full_at_maxsize():
+    async def run():
+        manager = make_manager(max_queued=2, max_concurrent=1)
+        try:
+            # The single worker takes the first task, the next two fill the queue
+            accepted = [await manager.create_task(TaskType.TEXT_GENERATION, "u1", "p0")]
+            await settle()
+            for i in (1, 2):
+                accepted.append(await manager.create_task(TaskType.TEXT_GENERATION, "u1", f"p{i}"))
+            assert manager.processor.started == 1
+            assert manager.task_queue.full()
+
+            with pytest.raises(TaskQueueFull):
+                await manager.create_task(TaskType.TEXT_GENERATION, "u1", "rejected")
+
+            # A rejected task leaves no trace behind
+            assert len(manager.tasks) == 3
+            assert list(manager.tasks_by_user["u1"]) == accepted[::-1]
+            assert manager.status_counts[TaskStatus.PENDING] == 2
+
+            # Once the backlog drains, new tasks are accepted again
+            manager.processor.release()
+            await asyncio.wait_for(manager.task_queue.join(), timeout=1)
+            await manager.create_task(TaskType.TEXT_GENERATION, "u1", "after drain")
+            assert all(
+                manager.tasks[task_id].status == TaskStatus.COMPLETED for task_id in accepted
+            )
+        finally:
+            await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_worker_pool_caps_concurrent_tasks():
+    async def run():
+        manager = make_manager(max_queued=10, max_concurrent=2)
+        try:
+            for i in range(5):
+                await manager.create_task(TaskType.TEXT_GENERATION, "u1", f"p{i}")
+            await settle()
+            assert manager.processor.running == 2
+            assert len(manager.active_tasks) == 2
+
+            manager.processor.release()
+            await asyncio.wait_for(manager.task_queue.join(), timeout=1)
+            assert manager.processor.started == 5
+            assert manager.processor.max_running == 2
+            assert manager.status_counts[TaskStatus.COMPLETED] == 5
+        finally:
+            await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_get_user_tasks_limits_newest_first():
+    async def run():
+        manager = make_manager(max_queued=10, max_concurrent=1)
+        try:
+            created = [await manager.create_task(TaskType.TEXT_GENERATION, "u1", f"p{i}") for i in range(3)]
+            newest_first = created[::-1]
+
+            assert [t.id for t in await manager.get_user_tasks("u1")] == newest_first
+            assert [t.id for t in await manager.get_user_tasks("u1", limit=2)] == newest_first[:2]
+            assert await manager.get_user_tasks("u1", limit=0) == []
+            # ?limit=-1 reaches here unvalidated; it must not raise
+            assert await manager.get_user_tasks("u1", limit=-1) == []
+            assert await manager.get_user_tasks("nobody") == []
+        finally:
+            await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_small_progress_ticks_are_stored_but_not_flushed():
+    async def run():
+        manager = make_manager(max_queued=10, max_concurrent=1)
+        try:
+            task_id = await manager.create_task(TaskType.TEXT_GENERATION, "u1", "p")
+            await manager.update_task_progress(task_id, 0, TaskStatus.PROCESSING)
+            task = manager.tasks[task_id]
+            flushed_at = task.updated_at
+
+            # Below the step and inside the interval: visible at once, no updated_at bump
+            await manager.update_task_progress(task_id, 3)
+            assert task.progress == 3
+            assert task.updated_at == flushed_at
+
+            # A full step applies the side effects again
+            await manager.update_task_progress(task_id, 6)
+            assert task.progress == 6
+            assert task._flushed_progress == 6
+
+            await manager.update_task_progress(task_id, 150)
+            assert task.progress == 100
+        finally:
+            await manager.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,170 @@
+"""
+UserManager JWT tests - HS256 tokens are issued and verified without pyjwt,
+so every way a token can be forged, stale or malformed must be rejected
+UserManager update tests - renames keep the email/username indexes consistent
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import asdict
+
+import pytest
+
+from services.user_manager import UserManager
+
+SECRET = "test-secret-of-at-least-32-bytes-for-hs256"
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def forge(header: dict, claims: dict, secret: str = SECRET) -> str:
+    """Build and sign a token by hand, so tests control every segment"""
+    signing_input = f"{b64url(json.dumps(header).encode())}.{b64url(json.dumps(claims).encode())}"
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{b64url(signature)}"
+
+
+@pytest.fixture
+def manager():
+    return UserManager(jwt_secret=SECRET)
+
+
+def test_round_trip(manager):
+    token = manager.generate_jwt_token("user-1")
+    assert manager.verify_jwt_token(token) == "user-1"
+
+
+def test_accepts_hand_built_token(manager):
+    token = forge({"alg": "HS256", "typ": "JWT"}, {"user_id": "user-1", "exp": time.time() + 60})
+    assert manager.verify_jwt_token(token) == "user-1"
+
+
+def test_rejects_tampered_payload(manager):
+    header, _, signature = manager.generate_jwt_token("user-1").split(".")
+    payload = b64url(json.dumps({"user_id": "admin", "exp": int(time.time()) + 3600}).encode())
+    assert manager.verify_jwt_token(f"{header}.{payload}.{signature}") is None
+
+
+def test_rejects_tampered_signature(manager):
+    header, payload, signature = manager.generate_jwt_token("user-1").split(".")
+    flipped = bytearray(base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4)))
+    flipped[0] ^= 1
+    assert manager.verify_jwt_token(f"{header}.{payload}.{b64url(bytes(flipped))}") is None
+
+
+def test_rejects_other_secret(manager):
+    token = UserManager(jwt_secret="other-secret").generate_jwt_token("user-1")
+    assert manager.verify_jwt_token(token) is None
+
+
+@pytest.mark.parametrize("alg", ["none", "HS512", "RS256", None])
+def test_rejects_wrong_alg(manager, alg):
+    # Correctly signed with the server key, so only the alg check can reject it
+    header = {"typ": "JWT"} if alg is None else {"alg": alg, "typ": "JWT"}
+    token = forge(header, {"user_id": "user-1", "exp": time.time() + 60})
+    assert manager.verify_jwt_token(token) is None
+
+
+def test_rejects_unsigned_alg_none(manager):
+    header = b64url(json.dumps({"alg": "none", "typ": "JWT"}).encode())
+    payload = b64url(json.dumps({"user_id": "user-1"}).encode())
+    assert manager.verify_jwt_token(f"{header}.{payload}.") is None
+
+
+def test_rejects_expired(manager):
+    token = forge({"alg": "HS256", "typ": "JWT"}, {"user_id": "user-1", "exp": int(time.time()) - 1})
+    assert manager.verify_jwt_token(token) is None
+
+
+@pytest.mark.parametrize("exp", ["9999999999", None, [1], True])
+def test_rejects_non_numeric_exp(manager, exp):
+    token = forge({"alg": "HS256", "typ": "JWT"}, {"user_id": "user-1", "exp": exp})
+    assert manager.verify_jwt_token(token) is None
+
+
+def test_accepts_token_without_exp(manager):
+    token = forge({"alg": "HS256", "typ": "JWT"}, {"user_id": "user-1"})
+    assert manager.verify_jwt_token(token) == "user-1"
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "abc",
+    "a.b",
+    "a.b.c.d",
+    "...",
+    "!!!.???.***",
+    "é.é.é",
+])
+def test_rejects_malformed_segments(manager, token):
+    assert manager.verify_jwt_token(token) is None
+
+
+def test_rejects_correctly_signed_non_json(manager):
+    header = b64url(b'{"alg":"HS256","typ":"JWT"}')
+    signing_input = f"{header}.{b64url(b'not json')}"
+    signature = hmac.new(SECRET.encode(), signing_input.encode(), hashlib.sha256).digest()
+    assert manager.verify_jwt_token(f"{signing_input}.{b64url(signature)}") is None
+
+
+def test_interoperates_with_pyjwt(manager):
+    jwt = pytest.importorskip("jwt")
+    token = manager.generate_jwt_token("user-1")
+    assert jwt.decode(token, SECRET, algorithms=["HS256"])["user_id"] == "user-1"
+
+    issued = jwt.encode({"user_id": "user-2", "exp": int(time.time()) + 60}, SECRET, algorithm="HS256")
+    assert manager.verify_jwt_token(issued) == "user-2"
+
+
+def make_users(manager):
+    async def run():
+        alice = await manager.create_user("Alice", "alice@example.com", "pw-alice")
+        bob = await manager.create_user("Bob", "bob@example.com", "pw-bob")
+        return alice, bob
+
+    return asyncio.run(run())
+
+
+def test_update_renames_and_reindexes(manager):
+    alice, _ = make_users(manager)
+
+    async def run():
+        assert await manager.update_user(alice.user_id, {"email": "Alice@New.example", "username": "alice2"})
+        assert await manager.get_user_by_email("alice@new.example") is alice
+        assert await manager.get_user_by_username("ALICE2") is alice
+        assert await manager.get_user_by_email("alice@example.com") is None
+        assert await manager.get_user_by_username("alice") is None
+
+        # Changing only the case of your own email is not a conflict
+        assert await manager.update_user(alice.user_id, {"email": "ALICE@new.example"})
+        assert alice.email == "ALICE@new.example"
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("updates", [
+    {"role": "admin", "email": "bob@example.com"},
+    {"role": "admin", "username": "BOB"},
+    {"role": "admin", "email": None},
+    {"role": "admin", "username": 42},
+    {"email": "alice@new.example", "role": "not-a-role"},
+])
+def test_rejected_update_changes_nothing(manager, updates):
+    alice, bob = make_users(manager)
+    before = (dict(manager._users_by_email), dict(manager._users_by_username), asdict(alice))
+
+    with pytest.raises(ValueError):
+        asyncio.run(manager.update_user(alice.user_id, updates))
+
+    assert (dict(manager._users_by_email), dict(manager._users_by_username), asdict(alice)) == before
+    assert asyncio.run(manager.get_user_by_email("bob@example.com")) is bob
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -1,18 +1,117 @@
 import gradio as gr
+import asyncio
 import sys
 import os
+from typing import Any, Dict, Optional
+from fastapi import FastAPI
+from pydantic import BaseModel, Field
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 from backend.app.models.enhanced_video_generation import EnhancedVideoGenerationService
 from backend.app.models.enhanced_audio_generation import EnhancedAudioGenerationService
 from backend.app.models.enhanced_app_generation import EnhancedAppGenerationService
 from backend.app.models.enhanced_image_generation import EnhancedImageGenerationService
+from response_cache import cache_lookup, cache_store, cached_call
+from batching import DynamicBatcher, MemoryBudget
 
-# Initialize services
-video_service = EnhancedVideoGenerationService()
-audio_service = EnhancedAudioGenerationService()
-app_service = EnhancedAppGenerationService()
-image_service = EnhancedImageGenerationService()
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# Services are created on first use (or by the warm-up on page load) so that
+# importing the app stays cheap on Space restarts
+SERVICE_CLASSES = {
+    "video": EnhancedVideoGenerationService,
+    "audio": EnhancedAudioGenerationService,
+    "app": EnhancedAppGenerationService,
+    "image": EnhancedImageGenerationService,
+}
+_services: Dict[str, Any] = {}
+_services_lock = asyncio.Lock()
+
+async def get_service(name: str):
+    """Return the shared service instance for name, creating it on first use"""
+    service = _services.get(name)
+    if service is None:
+        async with _services_lock:
+            service = _services.get(name)
+            if service is None:
+                # Construction may load model weights; keep it off the event loop
+                service = await asyncio.to_thread(SERVICE_CLASSES[name])
+                _services[name] = service
+    return service
+
+# Optionally run one tiny request per service right after it is created, so one-off
+# model setup (kernel compilation, allocator growth) happens before the first real user
+WARMUP_INFERENCE = os.getenv("WARMUP_INFERENCE", "false").lower() == "true"
+WARMUP_CALLS = {
+    "video": lambda service: service.generate_video(prompt="a red dot", duration=5, resolution="480p", fps=24),
+    "audio": lambda service: service.generate_audio(audio_type="music", prompt="a short beep", duration=5),
+    "image": lambda service: service.generate_image_batch(["a red dot"], size="512x512"),
+}
+_warmup_tasks = set()
+_warmed = set()
+
+async def warm_service(name: str):
+    """Create the service and, if enabled, run its warm-up request"""
+    service = await get_service(name)
+    if WARMUP_INFERENCE and name in WARMUP_CALLS:
+        await WARMUP_CALLS[name](service)
+
+async def warmup():
+    """Start warming every service in the background, once per process"""
+    for name in SERVICE_CLASSES:
+        if name not in _warmed:
+            _warmed.add(name)
+            # Hold a reference so the task isn't garbage collected mid-run
+            task = asyncio.create_task(warm_service(name))
+            _warmup_tasks.add(task)
+            task.add_done_callback(_warmup_tasks.discard)
+
+def default_gpu_budget_gb() -> float:
+    """GPU_MEMORY_BUDGET_GB if set, else 80% of the first GPU, else 16"""
+    if os.getenv("GPU_MEMORY_BUDGET_GB"):
+        return float(os.getenv("GPU_MEMORY_BUDGET_GB"))
+    if torch is not None and torch.cuda.is_available():
+        return torch.cuda.get_device_properties(0).total_memory / 1e9 * 0.8
+    return 16.0
+
+gpu_memory = MemoryBudget(default_gpu_budget_gb())
+
+# Rough per-request working memory, scaled by output size
+VIDEO_RESOLUTION_MEGAPIXELS = {'480p': 0.41, '720p': 0.92, '1080p': 2.07, '4k': 8.29}
+
+def estimate_image_gb(size: str, num_images: int) -> float:
+    width, height = map(int, size.split('x')) if 'x' in size else (1024, 1024)
+    return 1.5 * width * height / 1e6 * num_images
+
+def estimate_video_gb(resolution: str, duration: int) -> float:
+    return 0.1 * VIDEO_RESOLUTION_MEGAPIXELS.get(resolution, 2.07) * duration
+
+def estimate_audio_gb(duration: int) -> float:
+    return 1.0 + 0.02 * duration
+
+# Multi-image requests are split into single-image calls, and concurrent calls with
+# the same settings are batched into one pipeline pass; this caps how many passes
+# run at once across all users
+MAX_PARALLEL_IMAGES = int(os.getenv("MAX_PARALLEL_IMAGES", "4"))
+MAX_IMAGE_BATCH_SIZE = int(os.getenv("MAX_IMAGE_BATCH_SIZE", "8"))
+IMAGE_BATCH_TIMEOUT_MS = int(os.getenv("IMAGE_BATCH_TIMEOUT_MS", "30"))
+image_slots = asyncio.Semaphore(MAX_PARALLEL_IMAGES)
+
+async def run_image_batch(key, prompts):
+    """Generate one image per prompt for a batch sharing style, size, model and negative prompt"""
+    style, size, model, negative_prompt = key
+    image_service = await get_service("image")
+    async with image_slots, gpu_memory.reserve(estimate_image_gb(size, len(prompts))):
+        return await image_service.generate_image_batch(
+            prompts, style=style, size=size, model=model, negative_prompt=negative_prompt
+        )
+
+image_batcher = DynamicBatcher(
+    run_image_batch, max_batch_size=MAX_IMAGE_BATCH_SIZE, timeout_ms=IMAGE_BATCH_TIMEOUT_MS
+)
 
 # Custom CSS for better mobile experience
 custom_css = """
@@ -30,17 +129,23 @@ custom_css = """
 }
 """
 
+async def run_video(params):
+    """Generate a video once enough GPU memory is free"""
+    video_service = await get_service("video")
+    async with gpu_memory.reserve(estimate_video_gb(params['resolution'], params['duration'])):
+        return await video_service.generate_video(**params)
+
+async def run_audio(params):
+    """Generate audio once enough GPU memory is free"""
+    audio_service = await get_service("audio")
+    async with gpu_memory.reserve(estimate_audio_gb(params['duration'])):
+        return await audio_service.generate_audio(**params)
+
 async def generate_video_interface(prompt, model, style, duration, resolution, fps):
     """Video generation interface for Gradio"""
     try:
-        result = await video_service.generate_video(
-            prompt=prompt,
-            model=model,
-            style=style,
-            duration=int(duration),
-            resolution=resolution,
-            fps=int(fps)
-        )
+        params = dict(prompt=prompt, model=model, style=style, duration=int(duration), resolution=resolution, fps=int(fps))
+        result = await cached_call("video", params, lambda: run_video(params))
         
         if result['success']:
             return f"✅ Video generated successfully! Model: {model}", result.get('videoUrl', ''), result.get('enhanced_prompt', prompt)
@@ -52,14 +157,8 @@ async def generate_video_interface(prompt, model, style, duration, resolution, f
 async def generate_audio_interface(audio_type, prompt, model, duration, genre, voice):
     """Audio generation interface for Gradio"""
     try:
-        result = await audio_service.generate_audio(
-            audio_type=audio_type,
-            prompt=prompt,
-            model=model,
-            duration=int(duration),
-            genre=genre,
-            voice=voice
-        )
+        params = dict(audio_type=audio_type, prompt=prompt, model=model, duration=int(duration), genre=genre, voice=voice)
+        result = await cached_call("audio", params, lambda: run_audio(params))
         
         if result['success']:
             return f"✅ Audio generated successfully! Model: {model}", result.get('audioUrl', ''), result.get('enhanced_prompt', prompt)
@@ -71,16 +170,15 @@ async def generate_audio_interface(audio_type, prompt, model, duration, genre, v
 async def generate_app_interface(description, app_type, framework, features, design_style, model):
     """App generation interface for Gradio"""
     try:
-        features_list = [f.strip() for f in features.split(',') if f.strip()]
+        features_list = [f for f in map(str.strip, features.split(',')) if f]
         
-        result = await app_service.generate_app(
-            description=description,
-            app_type=app_type,
-            framework=framework,
-            features=features_list,
-            design_style=design_style,
-            model=model
-        )
+        params = dict(description=description, app_type=app_type, framework=framework, features=features_list, design_style=design_style, model=model)
+        
+        async def generate():
+            app_service = await get_service("app")
+            return await app_service.generate_app(**params)
+        
+        result = await cached_call("app", params, generate)
         
         if result['success']:
             return f"✅ App generated successfully! Framework: {framework}", result.get('code', ''), result.get('downloadUrl', '')
@@ -89,47 +187,168 @@ async def generate_app_interface(description, app_type, framework, features, des
     except Exception as e:
         return f"❌ Error: {str(e)}", "", ""
 
+async def generate_single_image(prompt, style, size, model, negative_prompt=None):
+    """Generate one image, batched with concurrent requests that use the same settings"""
+    return await image_batcher.submit((style, size, model, negative_prompt), prompt)
+
+async def stream_images(num_images, **params):
+    """Start num_images single-image calls and yield each result (or exception) as it finishes"""
+    pending = [asyncio.ensure_future(generate_single_image(**params)) for _ in range(num_images)]
+    for next_done in asyncio.as_completed(pending):
+        try:
+            yield await next_done
+        except Exception as e:
+            yield e
+
+async def generate_images(num_images, **params):
+    """Generate num_images images as concurrent single-image calls and merge the results"""
+    results = await asyncio.gather(
+        *(generate_single_image(**params) for _ in range(num_images)),
+        return_exceptions=True
+    )
+    return merge_image_results(results)
+
+def merge_image_results(results):
+    """Combine single-image results into one, failing only if every image failed"""
+    succeeded = [r for r in results if isinstance(r, dict) and r.get('success')]
+    if not succeeded:
+        first = results[0]
+        error = str(first) if isinstance(first, Exception) else first.get('error', 'Unknown error')
+        return {'success': False, 'error': error}
+    
+    # Keep the first result's metadata (enhanced prompt, model) and collect every image
+    return {**succeeded[0], 'imageUrls': [url for r in succeeded for url in r.get('imageUrls', [])]}
+
 async def generate_image_interface(prompt, style, size, model, negative_prompt, num_images):
-    """Image generation interface for Gradio"""
+    """Image generation interface for Gradio, filling the gallery as images finish"""
     try:
-        result = await image_service.generate_image(
-            prompt=prompt,
-            style=style,
-            size=size,
-            model=model,
-            negative_prompt=negative_prompt,
-            num_images=int(num_images)
-        )
+        num_images = int(num_images)
+        params = dict(prompt=prompt, style=style, size=size, model=model, negative_prompt=negative_prompt)
+        key, result = cache_lookup("image", {**params, 'num_images': num_images})
+        
+        if result is None:
+            yield f"⏳ Generating {num_images} image(s)...", [], ""
+            
+            results = []
+            images = []
+            enhanced_prompt = ""
+            async for single in stream_images(num_images, **params):
+                results.append(single)
+                if isinstance(single, dict) and single.get('success'):
+                    images += single.get('imageUrls', [])
+                    # Every image shares the prompt, so the first finished one tells us how it was enhanced
+                    enhanced_prompt = enhanced_prompt or single.get('enhanced_prompt', '')
+                yield f"⏳ {len(results)}/{num_images} image(s) finished...", images, enhanced_prompt
+            
+            result = merge_image_results(results)
+            cache_store(key, result)
         
         if result['success']:
             images = result.get('imageUrls', [])
-            return f"✅ {len(images)} image(s) generated successfully! Model: {model}", images, result.get('enhanced_prompt', prompt)
+            yield f"✅ {len(images)} image(s) generated successfully! Model: {model}", images, result.get('enhanced_prompt', prompt)
         else:
-            return f"❌ Generation failed: {result.get('error', 'Unknown error')}", [], ""
+            yield f"❌ Generation failed: {result.get('error', 'Unknown error')}", [], ""
     except Exception as e:
-        return f"❌ Error: {str(e)}", [], ""
+        yield f"❌ Error: {str(e)}", [], ""
+
+# Each tab gets its own Gradio concurrency group so a long video render doesn't hold
+# up the cheaper tabs. The image tab admits a full batch of requests at once so the
+# batcher has something to group
+CONCURRENCY_LIMITS = {
+    "video": int(os.getenv("VIDEO_CONCURRENCY", "2")),
+    "audio": int(os.getenv("AUDIO_CONCURRENCY", "3")),
+    "app": int(os.getenv("APP_CONCURRENCY", "4")),
+    "image": MAX_IMAGE_BATCH_SIZE,
+}
+MAX_QUEUE_SIZE = int(os.getenv("MAX_QUEUE_SIZE", "64"))
+
+# Static page copy, kept out of the layout code below
+HEADER_MD = """
+# 🤖 AI Agent Studio - Complete Creative Suite
+
+**Create anything with AI - Videos, Apps, Music, Images, and more!**
+
+✨ **Features:**
+- 🎬 **Video Generation**: Wan2.2, ModelScope, Stable Video Diffusion
+- 🎵 **Audio Creation**: MusicGen, Jukebox, Bark, Coqui TTS
+- 📱 **App Development**: Code Llama 3, DeepSeek-Coder, StarCoder 2
+- 🎨 **Image Generation**: Stable Diffusion XL, GFPGAN, Real-ESRGAN
+- 🔧 **All Models Free**: Using open-source GitHub repositories
+
+> **Mobile Optimized** for Poco X6 Pro (12GB RAM) and 8GB+ devices
+"""
+
+MODEL_LIST_MD = """
+### Available Models:
+
+**Video Models:**
+- Wan2.2 (ModelScope)
+- Stable Video Diffusion
+- Deforum Stable Diffusion
+
+**Audio Models:**
+- MusicGen (Meta)
+- Jukebox (OpenAI)
+- Bark (Suno AI)
+- Coqui TTS
+- ChatterBox
+
+**Coding Models:**
+- Code Llama 3
+- DeepSeek-Coder
+- StarCoder 2
+- WizardCoder
+- Mistral 7B
+
+**Image Models:**
+- Stable Diffusion XL
+- Automatic1111
+- ComfyUI
+- GFPGAN
+- Real-ESRGAN
+- RemBG
+"""
+
+FOOTER_MD = """
+---
+
+### 🚀 Deployment Options
+
+**Mobile App:**
+- Download APK for Android
+- Optimized for Poco X6 Pro (12GB RAM)
+- Works on 8GB+ RAM devices
+
+**Free Hosting:**
+- Hugging Face Spaces (Current)
+- GitHub Pages (Frontend)
+- Railway/Render (Backend)
+
+**Social Media Integration:**
+- Direct upload to YouTube, TikTok, Instagram
+- Automated posting with scheduling
+- Multi-platform distribution
+
+---
+
+**🔗 Links:**
+- [GitHub Repository](https://github.com/Johnshah/ai-agent-studio-mobile-)
+- [Mobile App Download](https://github.com/Johnshah/ai-agent-studio-mobile-/releases)
+- [Documentation](https://github.com/Johnshah/ai-agent-studio-mobile-/wiki)
+
+**Made with ❤️ using open-source AI models**
+"""
+
+THEME = gr.themes.Soft()
 
 # Create Gradio interface
 with gr.Blocks(
     title="🤖 AI Agent Studio - Complete Creative Suite",
     css=custom_css,
-    theme=gr.themes.Soft()
+    theme=THEME
 ) as demo:
     
-    gr.Markdown("""
-    # 🤖 AI Agent Studio - Complete Creative Suite
-    
-    **Create anything with AI - Videos, Apps, Music, Images, and more!**
-    
-    ✨ **Features:**
-    - 🎬 **Video Generation**: Wan2.2, ModelScope, Stable Video Diffusion
-    - 🎵 **Audio Creation**: MusicGen, Jukebox, Bark, Coqui TTS
-    - 📱 **App Development**: Code Llama 3, DeepSeek-Coder, StarCoder 2
-    - 🎨 **Image Generation**: Stable Diffusion XL, GFPGAN, Real-ESRGAN
-    - 🔧 **All Models Free**: Using open-source GitHub repositories
-    
-    > **Mobile Optimized** for Poco X6 Pro (12GB RAM) and 8GB+ devices
-    """)
+    gr.Markdown(HEADER_MD)
     
     with gr.Tabs():
         
@@ -185,7 +404,9 @@ with gr.Blocks(
             video_generate_btn.click(
                 fn=generate_video_interface,
                 inputs=[video_prompt, video_model, video_style, video_duration, video_resolution, video_fps],
-                outputs=[video_status, video_output, video_enhanced_prompt]
+                outputs=[video_status, video_output, video_enhanced_prompt],
+                concurrency_id="video",
+                concurrency_limit=CONCURRENCY_LIMITS["video"]
             )
         
         # Audio Generation Tab
@@ -240,7 +461,9 @@ with gr.Blocks(
             audio_generate_btn.click(
                 fn=generate_audio_interface,
                 inputs=[audio_type, audio_prompt, audio_model, audio_duration, audio_genre, audio_voice],
-                outputs=[audio_status, audio_output, audio_enhanced_prompt]
+                outputs=[audio_status, audio_output, audio_enhanced_prompt],
+                concurrency_id="audio",
+                concurrency_limit=CONCURRENCY_LIMITS["audio"]
             )
         
         # App Generation Tab
@@ -297,7 +520,9 @@ with gr.Blocks(
             app_generate_btn.click(
                 fn=generate_app_interface,
                 inputs=[app_description, app_type, app_framework, app_features, app_design_style, app_model],
-                outputs=[app_status, app_code_output, app_download]
+                outputs=[app_status, app_code_output, app_download],
+                concurrency_id="app",
+                concurrency_limit=CONCURRENCY_LIMITS["app"]
             )
         
         # Image Generation Tab
@@ -359,7 +584,9 @@ with gr.Blocks(
             image_generate_btn.click(
                 fn=generate_image_interface,
                 inputs=[image_prompt, image_style, image_size, image_model, image_negative, image_num],
-                outputs=[image_status, image_gallery, image_enhanced_prompt]
+                outputs=[image_status, image_gallery, image_enhanced_prompt],
+                concurrency_id="image",
+                concurrency_limit=CONCURRENCY_LIMITS["image"]
             )
         
         # Model Management Tab
@@ -383,82 +610,70 @@ with gr.Blocks(
                     )
                     
                 with gr.Column():
-                    gr.Markdown("""
-                    ### Available Models:
-                    
-                    **Video Models:**
-                    - Wan2.2 (ModelScope)
-                    - Stable Video Diffusion
-                    - Deforum Stable Diffusion
-                    
-                    **Audio Models:**
-                    - MusicGen (Meta)
-                    - Jukebox (OpenAI)
-                    - Bark (Suno AI)
-                    - Coqui TTS
-                    - ChatterBox
-                    
-                    **Coding Models:**
-                    - Code Llama 3
-                    - DeepSeek-Coder
-                    - StarCoder 2
-                    - WizardCoder
-                    - Mistral 7B
-                    
-                    **Image Models:**
-                    - Stable Diffusion XL
-                    - Automatic1111
-                    - ComfyUI
-                    - GFPGAN
-                    - Real-ESRGAN
-                    - RemBG
-                    """)
+                    gr.Markdown(MODEL_LIST_MD)
             
             add_model_btn = gr.Button("➕ Add Custom Model", variant="secondary")
             custom_model_status = gr.Textbox(label="Status", interactive=False)
     
     # Footer
-    gr.Markdown("""
-    ---
-    
-    ### 🚀 Deployment Options
-    
-    **Mobile App:**
-    - Download APK for Android
-    - Optimized for Poco X6 Pro (12GB RAM)
-    - Works on 8GB+ RAM devices
-    
-    **Free Hosting:**
-    - Hugging Face Spaces (Current)
-    - GitHub Pages (Frontend)
-    - Railway/Render (Backend)
-    
-    **Social Media Integration:**
-    - Direct upload to YouTube, TikTok, Instagram
-    - Automated posting with scheduling
-    - Multi-platform distribution
-    
-    ---
+    gr.Markdown(FOOTER_MD)
     
-    **🔗 Links:**
-    - [GitHub Repository](https://github.com/Johnshah/ai-agent-studio-mobile-)
-    - [Mobile App Download](https://github.com/Johnshah/ai-agent-studio-mobile-/releases)
-    - [Documentation](https://github.com/Johnshah/ai-agent-studio-mobile-/wiki)
-    
-    **Made with ❤️ using open-source AI models**
-    """)
+    demo.load(fn=warmup, inputs=None, outputs=None)
+
+# Plain JSON endpoints for the mobile app, served on the same port as the UI. They skip
+# the Gradio queue protocol and share the services, batcher and cache with the tabs
+api = FastAPI(title="AI Agent Studio API")
+
+class VideoRequest(BaseModel):
+    prompt: str
+    model: str = "wan2.2"
+    style: str = "cinematic"
+    duration: int = Field(default=30, ge=5, le=600)
+    resolution: str = "1080p"
+    fps: int = Field(default=30, ge=24, le=60)
+    language: str = "en"
+
+class AudioRequest(BaseModel):
+    type: str
+    prompt: str
+    model: str = "musicgen"
+    duration: int = Field(default=30, ge=5, le=300)
+    genre: Optional[str] = None
+    voice: Optional[str] = None
+
+class ImageRequest(BaseModel):
+    prompt: str
+    style: str = "photorealistic"
+    size: str = "1024x1024"
+    model: str = "stable-diffusion"
+    negative_prompt: Optional[str] = None
+    num_images: int = Field(default=1, ge=1, le=8)
+
+@api.post("/api/video/generate")
+async def api_generate_video(request: VideoRequest):
+    params = request.model_dump()
+    return await cached_call("video", params, lambda: run_video(params))
+
+@api.post("/api/audio/generate")
+async def api_generate_audio(request: AudioRequest):
+    params = request.model_dump(exclude={"type"})
+    params["audio_type"] = request.type
+    return await cached_call("audio", params, lambda: run_audio(params))
+
+@api.post("/api/image/generate")
+async def api_generate_image(request: ImageRequest):
+    params = request.model_dump(exclude={"num_images"})
+    return await cached_call(
+        "image", {**params, 'num_images': request.num_images},
+        lambda: generate_images(request.num_images, **params)
+    )
 
 # Launch configuration for Hugging Face Spaces
 if __name__ == "__main__":
+    import uvicorn
+    
     demo.queue(
-        concurrency_count=3,
-        max_size=10,
+        max_size=MAX_QUEUE_SIZE,
         api_open=False
-    ).launch(
-        server_name="0.0.0.0",
-        server_port=7860,
-        share=False,
-        show_error=True,
-        show_tips=True,
-        enable_queue=True
-    )
\ No newline at end of file
+    )
+    uvicorn.run(gr.mount_gradio_app(api, demo, path="/"), host="0.0.0.0", port=7860)
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""Admission control and micro-batching for concurrent generation requests"""
+
+import asyncio
+import math
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class DynamicBatcher:
+    """Collect concurrent requests that share a key and run them as one batch
+    
+    A batch is flushed when it reaches max_batch_size or when its oldest request
+    has waited timeout_ms, whichever comes first. batch_fn(key, items) must return
+    one result per item, in order.
+    """
+    
+    def __init__(self, batch_fn, max_batch_size: int = 8, timeout_ms: int = 30):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout_ms / 1000
+        self.pending = {}
+        # Flushed batches still running; the loop only holds tasks weakly
+        self._running = set()
+    
+    async def submit(self, key, item):
+        """Queue item behind key and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        batch = self.pending.get(key)
+        if batch is None:
+            batch = self.pending[key] = []
+            loop.call_later(self.timeout, self._flush, key, batch)
+        batch.append((item, future))
+        
+        if len(batch) >= self.max_batch_size:
+            self._flush(key, batch)
+        
+        return await future
+    
+    def _flush(self, key, batch):
+        # The timer may fire after the batch was already flushed for being full
+        if self.pending.get(key) is not batch:
+            return
+        del self.pending[key]
+        task = asyncio.ensure_future(self._run(key, batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+    
+    async def _run(self, key, batch):
+        try:
+            try:
+                results = await self.batch_fn(key, [item for item, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            
+            for _, future in batch[len(results):]:
+                if not future.done():
+                    future.set_exception(RuntimeError(f"Batch function returned {len(results)} results for {len(batch)} items"))
+        finally:
+            # Cancelled (or failed while fanning out): never leave a caller waiting
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Batch did not complete"))
+
+
+class MemoryBudget:
+    """Admit work by its estimated GPU memory rather than by request count
+    
+    Costs are accounted in whole megabytes, so releases always add back exactly
+    what was reserved and an idle budget is exactly full again. Requests are
+    admitted in arrival order: a large request at the head of the line holds
+    back the smaller ones behind it rather than being overtaken by them forever.
+    """
+    
+    def __init__(self, capacity_gb: float):
+        self.capacity = max(1, round(capacity_gb * 1000))  # MB
+        self.available = self.capacity
+        self.condition = asyncio.Condition()
+        self._waiting = deque()
+    
+    @asynccontextmanager
+    async def reserve(self, cost_gb: float):
+        # A request larger than the whole budget still runs, once nothing else is
+        cost = min(max(math.ceil(cost_gb * 1000), 0), self.capacity)
+        ticket = object()
+        async with self.condition:
+            self._waiting.append(ticket)
+            try:
+                await self.condition.wait_for(lambda: self._waiting[0] is ticket and self.available >= cost)
+            finally:
+                # Admitted or cancelled, step out of line and let the next request check
+                self._waiting.remove(ticket)
+                self.condition.notify_all()
+            self.available -= cost
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.available += cost
+                self.condition.notify_all()
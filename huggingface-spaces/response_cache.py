@@ -0,0 +1,89 @@
+"""Exact-match cache for generation results, keyed by the request parameters"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+# /data is the persistent volume on Hugging Face Spaces, so entries survive restarts
+CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "/data/cache")
+CACHE_SIZE_LIMIT = int(os.getenv("RESPONSE_CACHE_SIZE_LIMIT", str(1024 ** 3)))
+MEMORY_CACHE_ENTRIES = 256
+
+
+def make_key(kind: str, params: Dict[str, Any]) -> str:
+    """Hash the request kind and its normalized parameters"""
+    normalized = {
+        name: value.strip() if isinstance(value, str) else value
+        for name, value in params.items()
+    }
+    payload = json.dumps({"kind": kind, **normalized}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Disk-backed when diskcache is installed and the directory is writable, in-memory LRU otherwise"""
+
+    def __init__(self, directory: str = CACHE_DIR):
+        self.disk = None
+        self.memory: "OrderedDict[str, Any]" = OrderedDict()
+
+        if diskcache is not None:
+            try:
+                self.disk = diskcache.Cache(directory, size_limit=CACHE_SIZE_LIMIT)
+            except OSError as e:
+                logger.warning(f"Response cache directory {directory} unavailable, using memory: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        if self.disk is not None:
+            return self.disk.get(key)
+
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        if self.disk is not None:
+            self.disk.set(key, value)
+            return
+
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        if len(self.memory) > MEMORY_CACHE_ENTRIES:
+            self.memory.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+def cache_lookup(kind: str, params: Dict[str, Any]) -> Tuple[str, Optional[Any]]:
+    """Return the key for (kind, params) and its cached result, if any"""
+    key = make_key(kind, params)
+    return key, response_cache.get(key)
+
+
+def cache_store(key: str, result: Dict[str, Any]):
+    """Cache result under key if it succeeded; failures are retried on the next request"""
+    if result.get('success'):
+        response_cache.set(key, result)
+
+
+async def cached_call(kind: str, params: Dict[str, Any], generate):
+    """Return the cached result for (kind, params), or await generate() and cache it if it succeeded"""
+    key, result = cache_lookup(kind, params)
+    if result is not None:
+        return result
+
+    result = await generate()
+    cache_store(key, result)
+    return result
@@ -0,0 +1,253 @@
+"""
+DynamicBatcher tests - flush on size and on timeout, and error fan-out
+MemoryBudget tests - exact accounting, oversized requests and arrival-order admission
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from batching import DynamicBatcher, MemoryBudget
+
+
+def make_recorder(results_fn=None):
+    """batch_fn that records each batch it receives and echoes its items back by default"""
+    calls = []
+
+    async def batch_fn(key, items):
+        calls.append((key, list(items)))
+        return results_fn(items) if results_fn else [f"{key}:{item}" for item in items]
+
+    return batch_fn, calls
+
+
+def test_flushes_when_batch_is_full():
+    batch_fn, calls = make_recorder()
+
+    async def run():
+        # A long timeout, so only reaching max_batch_size can flush
+        batcher = DynamicBatcher(batch_fn, max_batch_size=3, timeout_ms=60_000)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit("k", i) for i in range(3))), timeout=1
+        )
+
+    assert asyncio.run(run()) == ["k:0", "k:1", "k:2"]
+    assert calls == [("k", [0, 1, 2])]
+
+
+def test_flushes_partial_batch_on_timeout():
+    batch_fn, calls = make_recorder()
+
+    async def run():
+        batcher = DynamicBatcher(batch_fn, max_batch_size=8, timeout_ms=20)
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.submit("k", "a"), batcher.submit("k", "b")), timeout=1
+        )
+
+    assert asyncio.run(run()) == ["k:a", "k:b"]
+    assert calls == [("k", ["a", "b"])]
+
+
+def test_batches_by_key():
+    batch_fn, calls = make_recorder()
+
+    async def run():
+        batcher = DynamicBatcher(batch_fn, max_batch_size=8, timeout_ms=20)
+        return await asyncio.gather(
+            batcher.submit("x", 1), batcher.submit("y", 2), batcher.submit("x", 3)
+        )
+
+    assert asyncio.run(run()) == ["x:1", "y:2", "x:3"]
+    assert sorted(calls) == [("x", [1, 3]), ("y", [2])]
+
+
+def test_batch_failure_fans_out_to_every_caller():
+    async def batch_fn(key, items):
+        raise ValueError("pipeline failed")
+
+    async def run():
+        batcher = DynamicBatcher(batch_fn, max_batch_size=2, timeout_ms=20)
+        return await asyncio.gather(
+            batcher.submit("k", 1), batcher.submit("k", 2), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_per_item_exceptions_only_fail_their_caller():
+    batch_fn, _ = make_recorder(lambda items: [RuntimeError("bad item") if item == "bad" else item for item in items])
+
+    async def run():
+        batcher = DynamicBatcher(batch_fn, max_batch_size=2, timeout_ms=20)
+        return await asyncio.gather(
+            batcher.submit("k", "ok"), batcher.submit("k", "bad"), return_exceptions=True
+        )
+
+    ok, bad = asyncio.run(run())
+    assert ok == "ok"
+    assert isinstance(bad, RuntimeError)
+
+
+def test_missing_results_fail_leftover_callers():
+    batch_fn, _ = make_recorder(lambda items: items[:1])
+
+    async def run():
+        batcher = DynamicBatcher(batch_fn, max_batch_size=3, timeout_ms=20)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit("k", i) for i in range(3)), return_exceptions=True),
+            timeout=1,
+        )
+
+    first, *rest = asyncio.run(run())
+    assert first == 0
+    assert all(isinstance(r, RuntimeError) for r in rest)
+
+
+def test_cancelled_batch_fails_waiting_callers():
+    async def batch_fn(key, items):
+        await asyncio.sleep(60)
+        return items
+
+    async def run():
+        batcher = DynamicBatcher(batch_fn, max_batch_size=2, timeout_ms=20)
+        callers = asyncio.gather(batcher.submit("k", 1), batcher.submit("k", 2), return_exceptions=True)
+        await asyncio.sleep(0.05)
+        assert len(batcher._running) == 1
+        for task in list(batcher._running):
+            task.cancel()
+        results = await asyncio.wait_for(callers, timeout=1)
+        await asyncio.sleep(0)
+        return results, len(batcher._running)
+
+    results, running = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert running == 0
+
+
+async def hold(budget, cost_gb, started, release, name):
+    """Reserve cost_gb, note the start, and keep the reservation until release is set"""
+    async with budget.reserve(cost_gb):
+        started.append(name)
+        await release.wait()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_budget_drains_and_refills_exactly():
+    # Costs in the shape of the Space's estimates, which don't sum exactly as floats
+    costs = [0.1 * 0.41 * 7, 0.1 * 0.92 * 13, 1.5 * 0.262144, 1.0 + 0.02 * 37, 0.1 * 2.07 * 11, 1.5 * 1.048576 * 3]
+
+    async def run(seed):
+        rnd = random.Random(seed)
+        budget = MemoryBudget(16.0)
+        releases = []
+        tasks = []
+        started = []
+        for i in range(rnd.randrange(2, 12)):
+            release = asyncio.Event()
+            releases.append(release)
+            tasks.append(asyncio.create_task(hold(budget, rnd.choice(costs), started, release, i)))
+        await settle()
+
+        # Release in a random order, letting waiters in as room frees up
+        while releases:
+            releases.pop(rnd.randrange(len(releases))).set()
+            await settle()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        return budget
+
+    for seed in range(200):
+        budget = asyncio.run(run(seed))
+        assert budget.available == budget.capacity
+
+    async def full_request_after_churn():
+        budget = await run(0)
+        async with budget.reserve(16.0):
+            return budget.available
+
+    assert asyncio.run(asyncio.wait_for(full_request_after_churn(), timeout=1)) == 0
+
+
+def test_oversized_request_runs_alone_once_idle():
+    async def run():
+        budget = MemoryBudget(16.0)
+        started = []
+        small_release, big_release = asyncio.Event(), asyncio.Event()
+
+        small = asyncio.create_task(hold(budget, 2.0, started, small_release, "small"))
+        await settle()
+        big = asyncio.create_task(hold(budget, 40.0, started, big_release, "4k video"))
+        await settle()
+        assert started == ["small"]
+
+        small_release.set()
+        await settle()
+        assert started == ["small", "4k video"]
+        assert budget.available == 0
+
+        big_release.set()
+        await asyncio.wait_for(asyncio.gather(small, big), timeout=1)
+        assert budget.available == budget.capacity
+
+    asyncio.run(run())
+
+
+def test_large_waiter_is_not_overtaken_by_later_small_requests():
+    async def run():
+        budget = MemoryBudget(16.0)
+        started = []
+        release = {name: asyncio.Event() for name in ("a", "big", "c")}
+
+        first = asyncio.create_task(hold(budget, 4.0, started, release["a"], "a"))
+        await settle()
+        big = asyncio.create_task(hold(budget, 14.0, started, release["big"], "big"))
+        await settle()
+        # Would fit right now, but arrived after the waiting large request
+        later = asyncio.create_task(hold(budget, 2.0, started, release["c"], "c"))
+        await settle()
+        assert started == ["a"]
+
+        release["a"].set()
+        await settle()
+        assert started == ["a", "big", "c"]
+
+        release["big"].set()
+        release["c"].set()
+        await asyncio.wait_for(asyncio.gather(first, big, later), timeout=1)
+        assert budget.available == budget.capacity
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_line():
+    async def run():
+        budget = MemoryBudget(16.0)
+        started = []
+        release = {name: asyncio.Event() for name in ("a", "big", "c")}
+
+        first = asyncio.create_task(hold(budget, 10.0, started, release["a"], "a"))
+        await settle()
+        big = asyncio.create_task(hold(budget, 16.0, started, release["big"], "big"))
+        later = asyncio.create_task(hold(budget, 4.0, started, release["c"], "c"))
+        await settle()
+        assert started == ["a"]
+
+        big.cancel()
+        await settle()
+        assert started == ["a", "c"]
+
+        release["a"].set()
+        release["c"].set()
+        await asyncio.wait_for(asyncio.gather(first, later), timeout=1)
+        assert budget.available == budget.capacity
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,109 @@
+"""
+validate_all.py tests - a green run is only reused while the committed tree is unchanged
+"""
+
+import shutil
+import subprocess
+
+import pytest
+
+import validate_all
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+PASSING = {"Backend": ({"structure": {"passed": 1, "total": 1, "issues": []}}, 1, 1)}
+FAILING = {"Backend": ({"structure": {"passed": 0, "total": 1, "issues": ["Missing: x"]}}, 0, 1)}
+
+
+def git(repo, *args):
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """A committed throwaway repository that main() treats as the repository root"""
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "config", "user.email", "test@example.com")
+    git(tmp_path, "config", "user.name", "test")
+    (tmp_path / ".gitignore").write_text(".validate_cache/\n")
+    (tmp_path / "README.md").write_text("readme\n")
+    git(tmp_path, "add", "-A")
+    git(tmp_path, "commit", "-q", "-m", "init")
+
+    monkeypatch.setattr(validate_all, "__file__", str(tmp_path / "validate_all.py"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class FakeValidators:
+    """Stands in for run_validators, returning a canned result and counting calls"""
+
+    def __init__(self):
+        self.result = PASSING
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    fake = FakeValidators()
+    monkeypatch.setattr(validate_all, "run_validators", fake)
+    return fake
+
+
+def test_tree_key_tracks_committed_tree(repo):
+    key = validate_all.tree_key()
+    assert key is not None
+    assert validate_all.tree_key() == key
+
+    (repo / "README.md").write_text("changed\n")
+    git(repo, "commit", "-q", "-am", "change")
+    assert validate_all.tree_key() not in (None, key)
+
+
+def test_tree_key_is_none_on_dirty_tree(repo):
+    (repo / "README.md").write_text("uncommitted edit\n")
+    assert validate_all.tree_key() is None
+
+    git(repo, "checkout", "--", "README.md")
+    (repo / "untracked.txt").write_text("new file\n")
+    assert validate_all.tree_key() is None
+
+
+def test_green_run_is_reused_on_clean_tree(repo, runs, capsys):
+    assert validate_all.main(output_format="json")
+    assert validate_all.main(output_format="json")
+    assert runs.calls == 1
+    assert len(list((repo / ".validate_cache").iterdir())) == 1
+
+    # --no-skip always reruns
+    assert validate_all.main(skip=False, output_format="json")
+    assert runs.calls == 2
+
+
+def test_cache_is_skipped_on_dirty_tree(repo, runs, capsys):
+    assert validate_all.main(output_format="json")
+    assert runs.calls == 1
+
+    (repo / "README.md").write_text("uncommitted edit\n")
+    assert validate_all.main(output_format="json")
+    assert validate_all.main(output_format="json")
+    assert runs.calls == 3
+
+    # Nothing is cached for a dirty tree either
+    assert len(list((repo / ".validate_cache").iterdir())) == 1
+
+
+def test_failing_run_is_not_cached(repo, runs, capsys):
+    runs.result = FAILING
+    assert not validate_all.main(output_format="json")
+    assert not validate_all.main(output_format="json")
+    assert runs.calls == 2
+    assert not (repo / ".validate_cache").exists()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -2,20 +2,83 @@
 """
 Comprehensive Repository Validation Script
 Tests all components, dependencies, and deployment configurations
+
+Performance model: the run is I/O-bound (a few dozen stats, one scandir per
+probed directory, two git calls and a couple of small JSON parses); the CPU
+work is well under a millisecond. Tune syscalls and caching, not compute.
+Set PROFILE=1 to print per-phase timings to stderr.
 """
 
+import argparse
+import contextlib
+import copy
+import hashlib
 import os
 import sys
 import json
+import re
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson parses several times faster; both raise a json.JSONDecodeError subclass
+_json_loads = orjson.loads if orjson is not None else json.loads
 
-def run_command(command: str, cwd: str = None) -> Tuple[bool, str]:
-    """Run command and return success status and output"""
+PROFILE = os.getenv("PROFILE") == "1"
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Time the enclosed block and report it on stderr when PROFILE=1"""
+    if not PROFILE:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter_ns() - start) / 1e6
+        print(f"⏱️ {name}: {elapsed_ms:.2f} ms", file=sys.stderr)
+
+# What each validator expects to find, relative to the repository root
+# (mobile app entries are relative to the app directory)
+BACKEND_REQUIRED_FILES = (
+    "backend/requirements.txt",
+    "backend/app/main.py",
+    "backend/app/__init__.py",
+    "backend/app/api/__init__.py",
+    "backend/app/models/__init__.py"
+)
+BACKEND_ESSENTIAL_PACKAGES = ("fastapi", "uvicorn")
+MOBILE_APPS = ("mobile-app", "mobile-app-advanced")
+MOBILE_CONFIG_FILES = ("App.tsx", "app.json", "eas.json")
+MOBILE_SRC_DIRS = ("components", "screens", "services", "navigation")
+MOBILE_ASSET_DIRS = ("fonts", "images", "icons")
+HUGGINGFACE_FILES = ("huggingface-spaces/app.py", "huggingface-spaces/requirements.txt")
+SCRIPT_FILES = ("mobile-app-advanced/build-apk-pro.sh", "backend/setup_advanced.py")
+DOC_FILES = (
+    "README.md",
+    "COMPLETE_DEPLOYMENT_GUIDE.md",
+    "releases/APK-BUILD-INSTRUCTIONS.md"
+)
+
+# Everything after the package name in a requirement line (version, extras, markers)
+_REQUIREMENT_SUFFIX_RE = re.compile(r"[<>=!~\[;@\s]")
+
+def run_command(argv: List[str], cwd: str = None) -> Tuple[bool, str]:
+    """Run argv directly (no shell) and return success status and output,
+    e.g. run_command([sys.executable, "-c", "import fastapi"])"""
     try:
         result = subprocess.run(
-            command, shell=True, cwd=cwd, 
+            argv, cwd=cwd,
             capture_output=True, text=True, timeout=30
         )
         return result.returncode == 0, result.stdout + result.stderr
@@ -24,34 +87,66 @@ def run_command(command: str, cwd: str = None) -> Tuple[bool, str]:
     except Exception as e:
         return False, str(e)
 
+@lru_cache(maxsize=None)
+def _stat(file_path: str):
+    """Stat a path once per run; None if it does not exist"""
+    try:
+        return os.stat(file_path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
 def check_file_exists(file_path: str) -> bool:
     """Check if file exists"""
-    return Path(file_path).exists()
+    return _stat(file_path) is not None
+
+@lru_cache(maxsize=None)
+def _listdir_cache(parent: str) -> Dict[str, os.DirEntry]:
+    """List a directory once per run, keyed by entry name"""
+    try:
+        with os.scandir(parent) as entries:
+            return {entry.name: entry for entry in entries}
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+
+def check_dir_exists(parent: str, name: str) -> bool:
+    """Check if parent/name is a directory, using the parent's cached listing"""
+    entry = _listdir_cache(parent).get(name)
+    return entry is not None and entry.is_dir()
 
 def validate_json_file(file_path: str) -> Tuple[bool, str]:
     """Validate JSON file syntax"""
     try:
-        with open(file_path, 'r') as f:
-            json.load(f)
+        with open(file_path, 'rb') as f:
+            _json_loads(f.read())
         return True, "Valid JSON"
     except json.JSONDecodeError as e:
         return False, f"Invalid JSON: {e}"
     except Exception as e:
         return False, f"Error reading file: {e}"
 
+# package.json results by path, reused while the file's (mtime_ns, size) is unchanged
+_package_json_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
 def validate_package_json(file_path: str) -> Dict[str, Any]:
     """Validate package.json files"""
     results = {"exists": False, "valid_json": False, "has_dependencies": False, "issues": []}
     
-    if not check_file_exists(file_path):
+    try:
+        st = os.stat(file_path)
+    except (FileNotFoundError, NotADirectoryError):
         results["issues"].append("File does not exist")
         return results
     
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _package_json_cache.get(file_path)
+    if cached is not None and cached[0] == key:
+        return copy.deepcopy(cached[1])
+    
     results["exists"] = True
     
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        with open(file_path, 'rb') as f:
+            data = _json_loads(f.read())
         results["valid_json"] = True
         
         # Check essential fields
@@ -69,252 +164,223 @@ def validate_package_json(file_path: str) -> Dict[str, Any]:
     except Exception as e:
         results["issues"].append(f"JSON parsing error: {e}")
     
+    _package_json_cache[file_path] = (key, copy.deepcopy(results))
     return results
 
-def validate_backend() -> Dict[str, Any]:
+@dataclass(slots=True)
+class CategoryResult:
+    """Passed/total counts and issue messages for one category of checks"""
+    passed: int = 0
+    total: int = 0
+    issues: List[str] = field(default_factory=list)
+    
+    def check(self, ok: bool, issue: str) -> bool:
+        """Count one check, recording issue if it failed; returns ok"""
+        self.total += 1
+        if ok:
+            self.passed += 1
+        else:
+            self.issues.append(issue)
+        return ok
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"passed": self.passed, "total": self.total, "issues": self.issues}
+
+def _section(results: Dict[str, Any]) -> Tuple[Dict[str, Any], int, int]:
+    """Turn a validator's categories into plain dicts (for rendering, JSON and the cache) and total their counts"""
+    section = {}
+    passed = total = 0
+    for name, category in results.items():
+        if isinstance(category, CategoryResult):
+            passed += category.passed
+            total += category.total
+            category = category.to_dict()
+        section[name] = category
+    return section, passed, total
+
+def validate_backend() -> Tuple[Dict[str, Any], int, int]:
     """Validate backend configuration"""
-    print("🔧 Validating Backend...")
+    print("🔧 Validating Backend...\n", end="")  # one write, so concurrent validators don't interleave
     
-    results = {
-        "structure": {"passed": 0, "total": 0, "issues": []},
-        "requirements": {"passed": 0, "total": 0, "issues": []},
-        "main_app": {"passed": 0, "total": 0, "issues": []}
-    }
+    structure = CategoryResult()
+    requirements = CategoryResult()
+    main_app = CategoryResult()
     
     # Check file structure
-    required_files = [
-        "backend/requirements.txt",
-        "backend/app/main.py",
-        "backend/app/__init__.py",
-        "backend/app/api/__init__.py",
-        "backend/app/models/__init__.py"
-    ]
-    
-    for file_path in required_files:
-        results["structure"]["total"] += 1
-        if check_file_exists(file_path):
-            results["structure"]["passed"] += 1
-        else:
-            results["structure"]["issues"].append(f"Missing: {file_path}")
+    for file_path in BACKEND_REQUIRED_FILES:
+        structure.check(check_file_exists(file_path), f"Missing: {file_path}")
     
     # Check requirements.txt
-    results["requirements"]["total"] += 1
     if check_file_exists("backend/requirements.txt"):
         try:
+            line_count = 0
+            package_names = set()
             with open("backend/requirements.txt", "r") as f:
-                lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        line_count += 1
+                        package_names.add(_REQUIREMENT_SUFFIX_RE.split(line, 1)[0].lower())
             
-            if len(lines) > 10:
-                results["requirements"]["passed"] += 1
-            else:
-                results["requirements"]["issues"].append("Too few dependencies")
+            requirements.check(line_count > 10, "Too few dependencies")
                 
             # Check for essential packages
-            req_text = " ".join(lines)
-            essential = ["fastapi", "uvicorn"]
-            for pkg in essential:
-                if pkg not in req_text:
-                    results["requirements"]["issues"].append(f"Missing essential package: {pkg}")
+            for pkg in BACKEND_ESSENTIAL_PACKAGES:
+                if pkg not in package_names:
+                    requirements.issues.append(f"Missing essential package: {pkg}")
         except Exception as e:
-            results["requirements"]["issues"].append(f"Error reading requirements: {e}")
+            requirements.check(False, f"Error reading requirements: {e}")
     else:
-        results["requirements"]["issues"].append("requirements.txt not found")
+        requirements.check(False, "requirements.txt not found")
     
-    # Test basic import
-    results["main_app"]["total"] += 1
-    success, output = run_command('python -c "import sys; sys.path.append(\'app\'); print(\'Import test passed\')"', cwd="backend")
-    if success:
-        results["main_app"]["passed"] += 1
-    else:
-        results["main_app"]["issues"].append(f"Import test failed: {output}")
+    # Test the main app compiles, in-process (executing it would start the services)
+    error = None
+    try:
+        with open("backend/app/main.py", "rb") as f:
+            compile(f.read(), "backend/app/main.py", "exec")
+    except (OSError, SyntaxError, ValueError) as e:
+        error = f"Import test failed: {e}"
+    main_app.check(error is None, error)
     
-    return results
+    return _section({"structure": structure, "requirements": requirements, "main_app": main_app})
 
-def validate_mobile_app(app_dir: str) -> Dict[str, Any]:
+def validate_mobile_app(app_dir: str) -> Tuple[Dict[str, Any], int, int]:
     """Validate mobile app configuration"""
-    print(f"📱 Validating Mobile App: {app_dir}...")
+    print(f"📱 Validating Mobile App: {app_dir}...\n", end="")
     
-    results = {
-        "package_json": {},
-        "app_config": {"passed": 0, "total": 0, "issues": []},
-        "structure": {"passed": 0, "total": 0, "issues": []},
-        "assets": {"passed": 0, "total": 0, "issues": []}
-    }
+    app_config = CategoryResult()
+    structure = CategoryResult()
+    assets = CategoryResult()
     
     # Validate package.json
-    package_path = f"{app_dir}/package.json"
-    results["package_json"] = validate_package_json(package_path)
+    package_json = validate_package_json(f"{app_dir}/package.json")
     
     # Check app configuration files
-    config_files = [
-        f"{app_dir}/App.tsx",
-        f"{app_dir}/app.json",
-        f"{app_dir}/eas.json"
-    ]
-    
-    for file_path in config_files:
-        results["app_config"]["total"] += 1
-        if check_file_exists(file_path):
-            results["app_config"]["passed"] += 1
-        else:
-            results["app_config"]["issues"].append(f"Missing: {file_path}")
+    for name in MOBILE_CONFIG_FILES:
+        file_path = f"{app_dir}/{name}"
+        app_config.check(check_file_exists(file_path), f"Missing: {file_path}")
     
     # Check source structure
-    src_dirs = [
-        f"{app_dir}/src/components",
-        f"{app_dir}/src/screens", 
-        f"{app_dir}/src/services",
-        f"{app_dir}/src/navigation"
-    ]
-    
-    for dir_path in src_dirs:
-        results["structure"]["total"] += 1
-        if Path(dir_path).is_dir():
-            results["structure"]["passed"] += 1
-        else:
-            results["structure"]["issues"].append(f"Missing directory: {dir_path}")
+    for name in MOBILE_SRC_DIRS:
+        structure.check(check_dir_exists(f"{app_dir}/src", name), f"Missing directory: {app_dir}/src/{name}")
     
     # Check assets
-    asset_dirs = [
-        f"{app_dir}/assets/fonts",
-        f"{app_dir}/assets/images",
-        f"{app_dir}/assets/icons"
-    ]
-    
-    for dir_path in asset_dirs:
-        results["assets"]["total"] += 1
-        if Path(dir_path).is_dir():
-            results["assets"]["passed"] += 1
-        else:
-            results["assets"]["issues"].append(f"Missing asset directory: {dir_path}")
-    
-    return results
+    for name in MOBILE_ASSET_DIRS:
+        assets.check(check_dir_exists(f"{app_dir}/assets", name), f"Missing asset directory: {app_dir}/assets/{name}")
+    
+    return _section({
+        "package_json": package_json,
+        "app_config": app_config,
+        "structure": structure,
+        "assets": assets
+    })
 
-def validate_deployment_configs() -> Dict[str, Any]:
+def validate_deployment_configs() -> Tuple[Dict[str, Any], int, int]:
     """Validate deployment configurations"""
-    print("🌐 Validating Deployment Configurations...")
+    print("🌐 Validating Deployment Configurations...\n", end="")
     
-    results = {
-        "huggingface": {"passed": 0, "total": 0, "issues": []},
-        "docker": {"passed": 0, "total": 0, "issues": []},
-        "scripts": {"passed": 0, "total": 0, "issues": []},
-        "documentation": {"passed": 0, "total": 0, "issues": []}
-    }
+    huggingface = CategoryResult()
+    docker = CategoryResult()
+    scripts = CategoryResult()
+    documentation = CategoryResult()
     
     # Check Hugging Face setup
-    hf_files = ["huggingface-spaces/app.py", "huggingface-spaces/requirements.txt"]
-    for file_path in hf_files:
-        results["huggingface"]["total"] += 1
-        if check_file_exists(file_path):
-            results["huggingface"]["passed"] += 1
-        else:
-            results["huggingface"]["issues"].append(f"Missing: {file_path}")
+    for file_path in HUGGINGFACE_FILES:
+        huggingface.check(check_file_exists(file_path), f"Missing: {file_path}")
     
     # Check build scripts
-    script_files = ["mobile-app-advanced/build-apk-pro.sh", "backend/setup_advanced.py"]
-    for file_path in script_files:
-        results["scripts"]["total"] += 1
-        if check_file_exists(file_path):
-            results["scripts"]["passed"] += 1
-            # Check if executable
-            if Path(file_path).suffix == ".sh":
-                if os.access(file_path, os.X_OK):
-                    pass  # Already executable
-                else:
-                    results["scripts"]["issues"].append(f"Script not executable: {file_path}")
-        else:
-            results["scripts"]["issues"].append(f"Missing: {file_path}")
+    for file_path in SCRIPT_FILES:
+        st = _stat(file_path)
+        # Check if executable (any execute bit, read from the cached stat)
+        if scripts.check(st is not None, f"Missing: {file_path}") and file_path.endswith(".sh") and not st.st_mode & 0o111:
+            scripts.issues.append(f"Script not executable: {file_path}")
     
     # Check documentation
-    doc_files = [
-        "README.md", 
-        "COMPLETE_DEPLOYMENT_GUIDE.md",
-        "releases/APK-BUILD-INSTRUCTIONS.md"
-    ]
-    for file_path in doc_files:
-        results["documentation"]["total"] += 1
-        if check_file_exists(file_path):
-            results["documentation"]["passed"] += 1
-            # Check file size (should not be empty)
-            if Path(file_path).stat().st_size < 100:
-                results["documentation"]["issues"].append(f"Documentation too short: {file_path}")
-        else:
-            results["documentation"]["issues"].append(f"Missing: {file_path}")
-    
-    return results
+    for file_path in DOC_FILES:
+        st = _stat(file_path)
+        # Check file size (should not be empty)
+        if documentation.check(st is not None, f"Missing: {file_path}") and st.st_size < 100:
+            documentation.issues.append(f"Documentation too short: {file_path}")
+    
+    return _section({
+        "huggingface": huggingface,
+        "docker": docker,
+        "scripts": scripts,
+        "documentation": documentation
+    })
 
-def print_results(section_name: str, results: Dict[str, Any]):
-    """Print validation results for a section"""
+def print_results(section_name: str, results: Dict[str, Any], total_passed: int, total_checks: int):
+    """Print validation results for a section, scored with the counts its validator kept"""
     print(f"\n{'='*20} {section_name} {'='*20}")
     
-    total_passed = 0
-    total_checks = 0
-    
     for category, data in results.items():
-        if isinstance(data, dict) and "passed" in data and "total" in data:
-            passed = data["passed"]
-            total = data["total"]
-            issues = data.get("issues", [])
-            
-            total_passed += passed
-            total_checks += total
-            
-            status = "✅" if passed == total else "⚠️" if passed > 0 else "❌"
-            print(f"{status} {category.title()}: {passed}/{total}")
-            
-            for issue in issues:
-                print(f"   🔸 {issue}")
-        
-        elif category == "package_json":
-            pkg_data = data
-            if pkg_data.get("exists") and pkg_data.get("valid_json"):
-                deps = pkg_data.get("dependency_count", 0)
+        if category == "package_json":
+            if data.get("exists") and data.get("valid_json"):
+                deps = data.get("dependency_count", 0)
                 print(f"✅ Package.json: Valid ({deps} dependencies)")
             else:
                 print(f"❌ Package.json: Issues found")
-                for issue in pkg_data.get("issues", []):
+                for issue in data.get("issues", []):
                     print(f"   🔸 {issue}")
+            continue
+        
+        passed = data["passed"]
+        total = data["total"]
+        status = "✅" if passed == total else "⚠️" if passed > 0 else "❌"
+        print(f"{status} {category.title()}: {passed}/{total}")
+        
+        for issue in data["issues"]:
+            print(f"   🔸 {issue}")
     
     # Overall section score
     if total_checks > 0:
         score = (total_passed / total_checks) * 100
         status_emoji = "🎉" if score >= 90 else "✅" if score >= 70 else "⚠️" if score >= 50 else "❌"
         print(f"\n{status_emoji} {section_name} Score: {score:.1f}% ({total_passed}/{total_checks})")
-    
-    return total_passed, total_checks
 
-def main():
-    """Main validation function"""
-    print("🔍 AI Agent Studio - Comprehensive Repository Validation")
-    print("=" * 60)
-    
-    # Change to repository root
-    os.chdir(Path(__file__).parent)
-    
-    all_results = {}
+# Results of green runs, keyed by a hash of the committed tree
+VALIDATION_CACHE_DIR = Path(".validate_cache")
+
+def tree_key() -> Optional[str]:
+    """Hash of the HEAD tree, or None outside git or when there are uncommitted changes"""
+    try:
+        status = subprocess.run(["git", "status", "--porcelain"], capture_output=True, timeout=30)
+        tree = subprocess.run(["git", "ls-tree", "-r", "HEAD"], capture_output=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    
+    if status.returncode != 0 or tree.returncode != 0 or status.stdout.strip():
+        return None
+    return hashlib.blake2b(tree.stdout).hexdigest()
+
+def _timed(label: str, validate):
+    with phase(label):
+        return validate()
+
+def run_validators() -> Dict[str, Tuple[Dict[str, Any], int, int]]:
+    """Run every validator and return (results, passed, total) by section name"""
+    validators = [("Backend", validate_backend)]
+    for app in MOBILE_APPS:
+        if check_file_exists(app):
+            validators.append((f"Mobile App ({app})", lambda app=app: validate_mobile_app(app)))
+    validators.append(("Deployment", validate_deployment_configs))
+    
+    # The validators touch separate parts of the tree, so run them side by side
+    # (the backend import test overlaps the filesystem checks) and report in order
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [(label, executor.submit(_timed, label, validate)) for label, validate in validators]
+    
+    return {label: future.result() for label, future in futures}
+
+def render_text(all_results: Dict[str, Tuple[Dict[str, Any], int, int]]) -> float:
+    """Print the human-readable report and return the overall score"""
     overall_passed = 0
     overall_total = 0
     
-    # Validate backend
-    all_results["Backend"] = validate_backend()
-    passed, total = print_results("Backend", all_results["Backend"])
-    overall_passed += passed
-    overall_total += total
-    
-    # Validate mobile apps
-    mobile_apps = ["mobile-app", "mobile-app-advanced"]
-    for app in mobile_apps:
-        if Path(app).exists():
-            all_results[f"Mobile App ({app})"] = validate_mobile_app(app)
-            passed, total = print_results(f"Mobile App ({app})", all_results[f"Mobile App ({app})"])
-            overall_passed += passed
-            overall_total += total
-    
-    # Validate deployment
-    all_results["Deployment"] = validate_deployment_configs()
-    passed, total = print_results("Deployment", all_results["Deployment"])
-    overall_passed += passed
-    overall_total += total
+    for label, (results, passed, total) in all_results.items():
+        print_results(label, results, passed, total)
+        overall_passed += passed
+        overall_total += total
     
     # Overall results
     print("\n" + "=" * 60)
@@ -347,14 +413,77 @@ def main():
         print("💡 Priority fixes needed:")
         
         # Show critical issues
-        for section, results in all_results.items():
+        for section, (results, _, _) in all_results.items():
             for category, data in results.items():
-                if isinstance(data, dict) and data.get("issues"):
+                if data.get("issues"):
                     print(f"   🔸 {section} - {category}: {len(data['issues'])} issues")
     
     print(f"\n📋 Validation completed at: {__import__('datetime').datetime.now()}")
+    return overall_score
+
+def render_json(all_results: Dict[str, Tuple[Dict[str, Any], int, int]]) -> float:
+    """Write the results and overall score to stdout as one JSON document and return the score"""
+    overall_passed = sum(passed for _, passed, _ in all_results.values())
+    overall_total = sum(total for _, _, total in all_results.values())
+    overall_score = (overall_passed / overall_total) * 100 if overall_total > 0 else 0
+    
+    report = {
+        "sections": {label: results for label, (results, _, _) in all_results.items()},
+        "passed": overall_passed,
+        "total": overall_total,
+        "score": round(overall_score, 1),
+        "ready": overall_score >= 75
+    }
+    payload = orjson.dumps(report) if orjson is not None else json.dumps(report).encode()
+    sys.stdout.buffer.write(payload + b"\n")
+    return overall_score
+
+def main(skip: bool = True, output_format: str = "text"):
+    """Main validation function"""
+    text = output_format == "text"
+    if text:
+        print("🔍 AI Agent Studio - Comprehensive Repository Validation")
+        print("=" * 60)
+    
+    # Change to repository root
+    os.chdir(Path(__file__).parent)
+    
+    # The stat caches hold for one run; a later main() in the same process must see fresh results
+    _stat.cache_clear()
+    _listdir_cache.cache_clear()
+    
+    # Reuse the last green result when nothing has changed since
+    with phase("tree key"):
+        key = tree_key()
+    cache_path = VALIDATION_CACHE_DIR / f"{key}.json" if key else None
+    if skip and cache_path is not None and check_file_exists(str(cache_path)):
+        if text:
+            print("⏭️ Tree unchanged since the last successful run, reusing its results (--no-skip to rerun)")
+        with phase("cached results"), open(cache_path, 'rb') as f:
+            all_results = _json_loads(f.read())
+    elif text:
+        with phase("validators"):
+            all_results = run_validators()
+    else:
+        # Keep the validators' progress lines off stdout so it stays valid JSON
+        with phase("validators"), contextlib.redirect_stdout(sys.stderr):
+            all_results = run_validators()
+    
+    with phase("report"):
+        overall_score = render_text(all_results) if text else render_json(all_results)
+    
+    if cache_path is not None and overall_score >= 75:
+        VALIDATION_CACHE_DIR.mkdir(exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump(all_results, f)
+    
     return overall_score >= 75
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser(description="Validate the repository structure and deployment setup")
+    parser.add_argument("--no-skip", action="store_true", help="run every check even if the tree is unchanged since the last successful run")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="report format written to stdout")
+    args = parser.parse_args()
+    
+    success = main(skip=not args.no_skip, output_format=args.format)
     sys.exit(0 if success else 1)
\ No newline at end of file